@@ -0,0 +1,35 @@
+"""
+Profiles a bot loop end to end against a generated scene, without a display.
+The synthetic window produces the same frames on every run, so timings are comparable between changes.
+"""
+import time
+
+from src.pixeler.bot.bot import Bot
+from src.pixeler.vision.color import Color
+from src.pixeler.vision.oir import mask_by_color
+from src.pixeler.window.virtual_window import SyntheticWindow
+
+FRAMES = 300
+
+
+class HeadlessBenchmark(Bot):
+    def on_start(self):
+        pass
+
+    def on_stop(self):
+        pass
+
+    def loop(self):
+        color = Color([0, 100, 100], [179, 255, 255])
+        start = time.perf_counter()
+        for _ in range(FRAMES):
+            mat_raw = self.window.screenshot()
+            mask_by_color(mat_raw, color)
+        elapsed = time.perf_counter() - start
+        self.log(f"{FRAMES} frames in {elapsed:.2f}s ({FRAMES / elapsed:.1f} fps)")
+
+
+if __name__ == '__main__':
+    example = HeadlessBenchmark(SyntheticWindow(2560, 1440))
+    example.start()
+    example.thread.join()
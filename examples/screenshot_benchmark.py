@@ -0,0 +1,39 @@
+"""
+Compares allocations per frame between a fresh screenshot conversion and converting into a reused buffer.
+Uses a synthetic 2560x1440 mss screenshot so it runs without a display.
+"""
+import time
+import tracemalloc
+
+import numpy as np
+from mss.screenshot import ScreenShot
+
+from src.pixeler.vision.utils import mss_to_cv2
+
+WIDTH, HEIGHT, FRAMES = 2560, 1440, 120
+
+
+def measure(shot: ScreenShot, out=None):
+    mss_to_cv2(shot, out)  # Warm up
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    allocated = 0
+    for _ in range(FRAMES):
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        mss_to_cv2(shot, out)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+    return allocated / FRAMES, elapsed / FRAMES
+
+
+if __name__ == '__main__':
+    raw = bytearray(np.random.randint(0, 256, WIDTH * HEIGHT * 4, dtype=np.uint8).tobytes())
+    shot = ScreenShot.from_size(raw, WIDTH, HEIGHT)
+    buffer = np.empty((HEIGHT, WIDTH, 3), dtype=np.uint8)
+
+    for name, out in (("new Mat per frame", None), ("reused out= buffer", buffer)):
+        per_frame, seconds = measure(shot, out)
+        print(f"{name}: {per_frame / 1024 / 1024:.2f} MB allocated/frame, {seconds * 1000:.2f} ms/frame")
@@ -0,0 +1,71 @@
+"""
+Compares full-resolution template matching against coarse-to-fine pyramid matching at common resolutions.
+Uses a synthetic window so it runs without a display.
+"""
+import time
+
+import cv2
+import numpy as np
+
+from src.pixeler.vision.oir import find_all_templates, find_template_in_image, find_template_pyramid
+from src.pixeler.vision.template_library import TemplateLibrary
+from src.pixeler.window.virtual_window import SyntheticWindow
+
+RESOLUTIONS = [(1280, 720), (1920, 1080), (2560, 1440)]
+RUNS = 10
+LIBRARY_SIZE = 20
+
+
+def make_template() -> cv2.Mat:
+    template = np.zeros((64, 64, 3), dtype=np.uint8)
+    cv2.circle(template, (32, 32), 20, (0, 200, 255), cv2.FILLED)
+    cv2.putText(template, "A7", (8, 45), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 3)
+    return template
+
+
+def measure(function, *args, **kwargs):
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        location, score = function(*args, **kwargs)
+    return (time.perf_counter() - start) / RUNS * 1000, location
+
+
+if __name__ == '__main__':
+    template = make_template()
+    for width, height in RESOLUTIONS:
+        # A plain Mat, so every pyramid run pays for its own downscale instead of hitting the Frame cache
+        image = np.asarray(SyntheticWindow(width, height).screenshot())
+        image[height // 2:height // 2 + 64, width // 3:width // 3 + 64] = template
+
+        full_ms, full_location = measure(find_template_in_image, image, template)
+        print(f"{width}x{height} full resolution: {full_ms:.1f} ms at {full_location}")
+        for levels in (1, 2, 3):
+            ms, location = measure(find_template_pyramid, image, template, levels=levels)
+            print(f"{width}x{height} pyramid levels={levels}: {ms:.1f} ms at {location} ({full_ms / ms:.1f}x)")
+
+    # Every occurrence of a template, and a whole library of sprites, against the same frames
+    library = TemplateLibrary(grayscale=False)
+    rng = np.random.default_rng(0)
+    for i in range(LIBRARY_SIZE):
+        library.add(f"sprite{i}", rng.integers(0, 256, (64, 64, 3), dtype=np.uint8))
+    library.add("A7", template)
+    for width, height in RESOLUTIONS:
+        image = np.asarray(SyntheticWindow(width, height).screenshot())
+        for x in range(3):
+            image[height // 2:height // 2 + 64, 100 + 200 * x:164 + 200 * x] = template
+
+        start = time.perf_counter()
+        cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+        match_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        boxes, _ = find_all_templates(image, template)
+        all_ms = (time.perf_counter() - start) * 1000
+        print(f"{width}x{height} matchTemplate: {match_ms:.1f} ms, find_all_templates: {all_ms:.1f} ms "
+              f"({len(boxes)} matches)")
+
+        start = time.perf_counter()
+        matches = library.match_all(image)
+        library_ms = (time.perf_counter() - start) * 1000
+        print(f"{width}x{height} match_all over {len(library)} templates: {library_ms:.1f} ms "
+              f"({len(matches)} matches)")
+    library.close()
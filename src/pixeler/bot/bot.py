@@ -1,15 +1,13 @@
 import time
 from abc import ABC, abstractmethod
-from typing import Union
 
 from src.pixeler.bot.bot_status import BotStatus
 from src.pixeler.bot.bot_thread import BotThread
-from src.pixeler.window.win32_window import Win32Window
-from src.pixeler.window.window import Window
+from src.pixeler.window.abstract_window import AbstractWindow
 
 
 class Bot(ABC):
-    def __init__(self, window: Union[Window | Win32Window] = None):
+    def __init__(self, window: AbstractWindow = None):
         self.window = window
         self.status = BotStatus.STOPPED
         self.thread: BotThread = None
@@ -66,7 +64,8 @@ class Bot(ABC):
             self.log(f"Ran for {time.time() - self.start_time} seconds.")
             self.thread.stop()
             self.thread.join()
-            self.window.close()
+            if self.window:
+                self.window.close()
             self.on_stop()
 
     def log(self, message: str):
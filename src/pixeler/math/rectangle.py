@@ -7,6 +7,7 @@ import pyautogui
 
 import src.pixeler.math.random as rd
 from src.pixeler.math.point import Point
+from src.pixeler.vision.frame import Frame
 
 
 class Rectangle:
@@ -74,7 +75,13 @@ class Rectangle:
     def contains_point(self, point: Point) -> bool:
         return (self.x <= point.x <= self.x + self.w) and (self.y <= point.y <= self.y + self.h)
 
-    def screenshot(self, save_path: str = None) -> cv2.Mat:
+    def screenshot(self, save_path: str = None, out: cv2.Mat = None) -> Frame:
+        """
+        Takes a screenshot of the screen area covered by this rectangle.
+        :param save_path: An optional path to save the screenshot to.
+        :param out: An optional BGR buffer to write the screenshot into. It is reused when its shape matches.
+        :return: A Frame of the rectangle.
+        """
         with mss.mss() as sct:
             # Define the bounding box for the region to capture
             monitor = {
@@ -86,17 +93,17 @@ class Rectangle:
             # Capture the region
             sct_img = sct.grab(monitor)
 
-            # Convert the raw image to a numpy array (OpenCV format)
-            img_np = np.array(sct_img)
+            # View the raw image as a numpy array (OpenCV format) without copying it
+            img_np = np.asarray(sct_img)
 
             # Convert the color from BGRA to BGR (if necessary)
-            img_np = cv2.cvtColor(img_np, cv2.COLOR_BGRA2BGR)
+            img_np = cv2.cvtColor(img_np, cv2.COLOR_BGRA2BGR, dst=out)
 
             # Save the image if a save_path is provided
             if save_path:
                 cv2.imwrite(save_path, img_np)
 
-            return img_np
+            return Frame(img_np)
 
     def to_dict(self):
         return {
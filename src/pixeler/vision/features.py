@@ -0,0 +1,212 @@
+"""
+Keypoint matching that finds templates at any scale or rotation, verified with a homography.
+"""
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Union
+
+import cv2
+import numpy as np
+
+from src.pixeler.math.rectangle import Rectangle
+from src.pixeler.vision.utils import convert_to_gray
+
+# FLANN's locality-sensitive hashing index, for binary descriptors like ORB's and AKAZE's
+FLANN_INDEX_LSH = 6
+
+
+class FeatureMatch(NamedTuple):
+    name: str
+    corners: np.ndarray
+    homography: np.ndarray
+    inliers: int
+
+    def rectangle(self) -> Rectangle:
+        """
+        Returns the upright bounding box of the matched corners.
+        """
+        x, y, w, h = cv2.boundingRect(self.corners.astype(np.float32))
+        return Rectangle(x, y, w, h)
+
+
+class FeatureTemplate:
+    def __init__(self, name: str, width: int, height: int, points: np.ndarray, descriptors: np.ndarray):
+        """
+        The keypoints of a template.
+        :param name: The name matches are reported under.
+        :param width: The width of the template image.
+        :param height: The height of the template image.
+        :param points: The keypoint locations as an (N, 2) array.
+        :param descriptors: The binary descriptors of the keypoints, one row per keypoint.
+        """
+        self.name = name
+        self.width = width
+        self.height = height
+        self.points = points
+        self.descriptors = descriptors
+        self.corners = np.float32([[0, 0], [width, 0], [width, height], [0, height]]).reshape(-1, 1, 2)
+
+
+class FeatureMatcher:
+    def __init__(self, detector: str = "orb", features: int = 1000, cache_dir: Union[str, Path] = None,
+                 ratio: float = 0.75, min_matches: int = 10, ransac_threshold: float = 5.0):
+        """
+        Matches a set of templates against frames using keypoints instead of pixels.
+        Template descriptors are computed once and optionally cached on disk. All templates share a single
+        index, so each frame costs one keypoint extraction and one nearest-neighbour search.
+        :param detector: "orb" (fast) or "akaze" (more robust to scale).
+        :param features: The most keypoints ORB keeps per image.
+        :param cache_dir: An optional directory where template descriptors are stored between runs.
+        :param ratio: Lowe's ratio test. A match is kept when its distance is below this share of the runner-up's.
+        :param min_matches: The fewest homography inliers a template needs to be reported.
+        :param ransac_threshold: The largest reprojection error in pixels of a homography inlier.
+        """
+        if detector == "orb":
+            self.detector = cv2.ORB_create(nfeatures=features)
+        elif detector == "akaze":
+            self.detector = cv2.AKAZE_create()
+        else:
+            raise ValueError(f"Unknown detector {detector}, use orb or akaze.")
+        self.detector_name = f"{detector}-{features}"
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ratio = ratio
+        self.min_matches = min_matches
+        self.ransac_threshold = ransac_threshold
+        self.templates: Dict[str, FeatureTemplate] = {}
+        self.index: Optional[cv2.FlannBasedMatcher] = None
+        self.owners: np.ndarray = np.empty(0, dtype=np.intp)
+        self.offsets: np.ndarray = np.empty(0, dtype=np.intp)
+        self.indexed: List[FeatureTemplate] = []
+
+    def extract(self, image: cv2.Mat) -> (np.ndarray, np.ndarray):
+        """
+        Detects the keypoints of an image.
+        :param image: The BGR or grayscale image. A Frame reuses its cached gray conversion.
+        :return: The keypoint locations as an (N, 2) array and their descriptors.
+        """
+        gray = convert_to_gray(image) if image.ndim == 3 else image
+        keypoints, descriptors = self.detector.detectAndCompute(gray, None)
+        points = np.float32([keypoint.pt for keypoint in keypoints]).reshape(-1, 2)
+        return points, descriptors
+
+    def add(self, name: str, image: cv2.Mat) -> FeatureTemplate:
+        """
+        Adds a template, replacing any template with the same name.
+        :param name: The name matches are reported under.
+        :param image: The template image, in BGR or grayscale.
+        :return: The template keypoints.
+        """
+        height, width = image.shape[:2]
+        cache_file = self.__cache_file(image)
+        if cache_file is not None and cache_file.exists():
+            with np.load(cache_file) as cached:
+                points, descriptors = cached['points'], cached['descriptors']
+        else:
+            points, descriptors = self.extract(image)
+            if descriptors is None:
+                descriptors = np.empty((0, self.detector.descriptorSize()), dtype=np.uint8)
+            if cache_file is not None:
+                np.savez(cache_file, points=points, descriptors=descriptors)
+        template = FeatureTemplate(name, width, height, points, descriptors)
+        self.templates[name] = template
+        self.index = None
+        return template
+
+    def load(self, name: str, path: Union[str, Path]) -> FeatureTemplate:
+        """
+        Loads a template from an image file.
+        :param name: The name matches are reported under.
+        :param path: The path to the image file.
+        :return: The template keypoints.
+        """
+        image = cv2.imread(str(path), cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise ValueError(f"Could not read template {path}.")
+        return self.add(name, image)
+
+    def remove(self, name: str):
+        """
+        Removes a template.
+        :param name: The name of the template.
+        """
+        if self.templates.pop(name, None) is not None:
+            self.index = None
+
+    def __len__(self):
+        return len(self.templates)
+
+    def match(self, image: cv2.Mat, names: Iterable[str] = None) -> List[FeatureMatch]:
+        """
+        Finds the templates in an image.
+        :param image: The image to search.
+        :param names: Optional names of the templates to report. Defaults to every template.
+        :return: A match per found template, with the template's corners projected into the image.
+        """
+        if self.index is None:
+            self.__build_index()
+        if not self.indexed:
+            return []
+        points, descriptors = self.extract(image)
+        if descriptors is None or len(descriptors) < 2:
+            return []
+
+        # Template descriptors are the index, so each frame keypoint votes for its nearest template keypoint
+        train = []
+        query = []
+        for pair in self.index.knnMatch(descriptors, k=2):
+            if len(pair) == 2 and pair[0].distance < self.ratio * pair[1].distance:
+                train.append(pair[0].trainIdx)
+                query.append(pair[0].queryIdx)
+        if not train:
+            return []
+        train = np.asarray(train, dtype=np.intp)
+        query = np.asarray(query, dtype=np.intp)
+        owners = self.owners[train]
+
+        wanted = None if names is None else set(names)
+        matches = []
+        for owner in np.unique(owners):
+            template = self.indexed[owner]
+            if wanted is not None and template.name not in wanted:
+                continue
+            selected = owners == owner
+            if np.count_nonzero(selected) < max(self.min_matches, 4):
+                continue
+            source = template.points[train[selected] - self.offsets[owner]].reshape(-1, 1, 2)
+            destination = points[query[selected]].reshape(-1, 1, 2)
+            homography, inliers = cv2.findHomography(source, destination, cv2.RANSAC, self.ransac_threshold)
+            if homography is None:
+                continue
+            count = int(np.count_nonzero(inliers))
+            if count < self.min_matches:
+                continue
+            corners = cv2.perspectiveTransform(template.corners, homography).reshape(-1, 2)
+            matches.append(FeatureMatch(template.name, corners, homography, count))
+        matches.sort(key=lambda match: match.inliers, reverse=True)
+        return matches
+
+    def __build_index(self):
+        self.indexed = [template for template in self.templates.values() if len(template.descriptors)]
+        # The ratio test needs two neighbours, and fewer descriptors could never reach min_matches anyway
+        if sum(len(template.descriptors) for template in self.indexed) < 2:
+            self.indexed = []
+        sizes = [len(template.descriptors) for template in self.indexed]
+        self.owners = np.repeat(np.arange(len(sizes)), sizes)
+        self.offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.intp) if sizes else self.offsets
+        self.index = cv2.FlannBasedMatcher(dict(algorithm=FLANN_INDEX_LSH, table_number=6, key_size=12,
+                                                multi_probe_level=1), dict(checks=50))
+        if self.indexed:
+            # One descriptor set for all templates keeps trainIdx global, owners maps it back to the template
+            self.index.add([np.concatenate([template.descriptors for template in self.indexed])])
+            self.index.train()
+
+    def __cache_file(self, image: cv2.Mat) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.detector_name.encode())
+        digest.update(str(image.shape).encode())
+        digest.update(np.ascontiguousarray(image).data)
+        return self.cache_dir / f"{digest.hexdigest()}.npz"
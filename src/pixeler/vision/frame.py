@@ -0,0 +1,85 @@
+"""
+A screenshot that remembers its color-space conversions.
+"""
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+
+
+class Frame(np.ndarray):
+    """
+    A BGR Mat that lazily computes and caches its gray, HSV, RGB and downscaled variants.
+    It is a regular NumPy array, so it can be passed to any OpenCV function. The vision functions
+    use the cache, so masking five colors on the same Frame costs one HSV conversion instead of five.
+
+    The cache is not updated when the pixels change: call invalidate() after drawing onto a Frame.
+    Slices of a Frame are Frames with their own, empty cache. Results of NumPy math on a Frame, like
+    frame.sum() or frame == 0, are plain arrays and scalars.
+    """
+
+    def __new__(cls, image: cv2.Mat) -> 'Frame':
+        return np.asarray(image).view(cls)
+
+    def __array_finalize__(self, obj):
+        self.conversions: Dict[int, cv2.Mat] = {}
+        self.downscales: Dict[Tuple[int, int], cv2.Mat] = {}
+
+    def __array_wrap__(self, array, context=None, return_scalar=False):
+        # Computations on a Frame produce new data rather than another screenshot, so ufunc and reduction
+        # results come back as plain arrays and scalars. Results written into a Frame through out= stay Frames.
+        if isinstance(array, Frame):
+            return array
+        if return_scalar:
+            return array[()]
+        return array.view(np.ndarray)
+
+    def convert(self, code: int) -> cv2.Mat:
+        """
+        Returns the Frame converted to another color space, converting only on the first call.
+        :param code: The color space conversion (cv2.COLOR_XXX).
+        :return: The converted Mat. Treat it as read-only, it is shared by every caller.
+        """
+        converted = self.conversions.get(code)
+        if converted is None:
+            converted = cv2.cvtColor(self.view(np.ndarray), code)
+            self.conversions[code] = converted
+        return converted
+
+    @property
+    def gray(self) -> cv2.Mat:
+        """The Frame in grayscale."""
+        return self.convert(cv2.COLOR_BGR2GRAY)
+
+    @property
+    def hsv(self) -> cv2.Mat:
+        """The Frame in HSV."""
+        return self.convert(cv2.COLOR_BGR2HSV)
+
+    @property
+    def rgb(self) -> cv2.Mat:
+        """The Frame in RGB."""
+        return self.convert(cv2.COLOR_BGR2RGB)
+
+    def downscaled(self, factor: int, gray: bool = False) -> cv2.Mat:
+        """
+        Returns the Frame shrunk by an integer factor, resizing only on the first call.
+        :param factor: The factor to divide the width and height by.
+        :param gray: Downscales the gray variant instead of the color Frame.
+        :return: The downscaled Mat. Treat it as read-only, it is shared by every caller.
+        """
+        key = (factor, gray)
+        downscaled = self.downscales.get(key)
+        if downscaled is None:
+            source = self.gray if gray else self.view(np.ndarray)
+            size = (max(source.shape[1] // factor, 1), max(source.shape[0] // factor, 1))
+            downscaled = cv2.resize(source, size, interpolation=cv2.INTER_AREA)
+            self.downscales[key] = downscaled
+        return downscaled
+
+    def invalidate(self):
+        """
+        Drops every cached variant, e.g. after drawing onto the Frame.
+        """
+        self.conversions.clear()
+        self.downscales.clear()
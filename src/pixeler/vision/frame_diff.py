@@ -0,0 +1,105 @@
+"""
+Tile-based change detection between consecutive screenshots.
+"""
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from src.pixeler.math.rectangle import Rectangle
+
+
+class FrameDiff:
+    def __init__(self, tile_size: int = 32, threshold: int = 8):
+        """
+        Splits frames into square tiles and reports which tiles changed since the previous frame.
+        Downstream vision work can then skip unchanged frames or only process the dirty areas.
+        :param tile_size: The width and height of a tile in pixels.
+        :param threshold: The smallest per-channel difference that counts as a change. Filters out noise.
+        """
+        if tile_size < 1:
+            raise ValueError("tile_size must be at least 1.")
+        self.tile_size = tile_size
+        self.threshold = threshold
+        self.previous: cv2.Mat = None
+        self.difference: cv2.Mat = None
+        self.dirty: np.ndarray = np.zeros((0, 0), dtype=bool)
+
+    def update(self, image: cv2.Mat) -> List[Rectangle]:
+        """
+        Compares a frame against the previous one and remembers it for the next call.
+        The first frame, or a frame with a different size, marks every tile as dirty.
+        :param image: The new frame.
+        :return: Rectangles covering the changed tiles, merged into horizontal runs.
+        """
+        height, width = image.shape[:2]
+        rows = -(-height // self.tile_size)
+        cols = -(-width // self.tile_size)
+
+        if self.previous is None or self.previous.shape != image.shape or self.previous.dtype != image.dtype:
+            self.previous = image.copy()
+            self.difference = np.empty_like(image)
+            self.dirty = np.ones((rows, cols), dtype=bool)
+            return self.rectangles()
+
+        cv2.absdiff(image, self.previous, dst=self.difference)
+        # Max difference per tile: reduce the tile rows, then the tile columns, then the channels
+        starts_y = np.arange(0, height, self.tile_size)
+        starts_x = np.arange(0, width, self.tile_size)
+        tiles = np.maximum.reduceat(np.maximum.reduceat(self.difference, starts_y, axis=0), starts_x, axis=1)
+        if tiles.ndim == 3:
+            tiles = tiles.max(axis=2)
+        self.dirty = tiles >= self.threshold
+
+        np.copyto(self.previous, image)
+        return self.rectangles()
+
+    def changed(self) -> bool:
+        """
+        Returns whether any tile changed in the last update.
+        :return: True if the last frame differed from the one before it.
+        """
+        return bool(self.dirty.any())
+
+    def rectangles(self) -> List[Rectangle]:
+        """
+        Returns the changed tiles of the last update as Rectangles, merging adjacent tiles of a row.
+        :return: Rectangles in frame coordinates, clipped to the frame.
+        """
+        height, width = self.previous.shape[:2] if self.previous is not None else (0, 0)
+        size = self.tile_size
+        rectangles = []
+        for row, col in zip(*np.nonzero(self.__run_starts())):
+            end = int(col)
+            while end + 1 < self.dirty.shape[1] and self.dirty[row, end + 1]:
+                end += 1
+            x, y = int(col) * size, int(row) * size
+            rectangles.append(Rectangle(x, y, min((end + 1) * size, width) - x, min(y + size, height) - y))
+        return rectangles
+
+    def bounding_rectangle(self) -> Optional[Rectangle]:
+        """
+        Returns one Rectangle enclosing every changed tile of the last update.
+        :return: The bounding Rectangle, or None if nothing changed.
+        """
+        rows, cols = np.nonzero(self.dirty)
+        if len(rows) == 0:
+            return None
+        height, width = self.previous.shape[:2]
+        size = self.tile_size
+        x, y = cols.min() * size, rows.min() * size
+        return Rectangle(int(x), int(y), int(min((cols.max() + 1) * size, width) - x),
+                         int(min((rows.max() + 1) * size, height) - y))
+
+    def reset(self):
+        """
+        Forgets the previous frame so the next update reports every tile as dirty.
+        """
+        self.previous = None
+        self.difference = None
+        self.dirty = np.zeros((0, 0), dtype=bool)
+
+    def __run_starts(self) -> np.ndarray:
+        starts = self.dirty.copy()
+        starts[:, 1:] &= ~self.dirty[:, :-1]
+        return starts
@@ -0,0 +1,146 @@
+"""
+OCR for fixed bitmap fonts, matching segmented glyphs against glyphs learned from samples.
+"""
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from src.pixeler.vision.utils import convert_to_gray
+
+# Weight of one pixel of size or baseline offset difference, against glyph pixels ranging from 0 to 1
+GEOMETRY_WEIGHT = 0.5
+
+
+class GlyphReader:
+    def __init__(self, glyph_size: Tuple[int, int] = (8, 12), threshold: int = None, min_score: float = 0.7,
+                 space_width: int = None):
+        """
+        Reads single-line text rendered in a known bitmap font, much faster than Tesseract.
+        Teach it the font with learn(), then read(). Glyphs are cut apart at empty columns, so fonts whose
+        characters touch each other are not supported.
+        :param glyph_size: The (width, height) every glyph is scaled to before comparing its shape.
+        Its size in pixels and its offset from the baseline are compared too.
+        :param threshold: The gray level separating text from background. Defaults to Otsu's threshold.
+        Whichever side covers fewer pixels is taken as the text, so both light and dark text work.
+        :param min_score: The similarity between 0 and 1 a glyph needs to be recognized. Others read as "?".
+        :param space_width: The narrowest gap in pixels that reads as a space. Defaults to a width learned
+        from the gaps between the characters of the samples.
+        """
+        self.glyph_size = glyph_size
+        self.threshold = threshold
+        self.min_score = min_score
+        self.space_width = space_width
+        self.characters: List[str] = []
+        self.templates = np.empty((0, glyph_size[0] * glyph_size[1] + 4), dtype=np.float32)
+        self.norms = np.empty(0, dtype=np.float32)
+        self.widest_gap = 0
+        self.narrowest_space = None
+
+    def __len__(self):
+        return len(self.characters)
+
+    def learn(self, image: cv2.Mat, text: str):
+        """
+        Learns the glyphs of a sample image. Learning several samples of a character makes reading more robust.
+        :param image: A single line of text in the font.
+        :param text: The text shown by the image. Spaces between words also teach the width of a space.
+        """
+        words = text.split()
+        characters = [character for word in words for character in word]
+        glyphs, gaps = self.__segment(image)
+        if len(glyphs) != len(characters):
+            raise ValueError(f"Found {len(glyphs)} glyphs in the sample but {len(characters)} characters in {text!r}.")
+        # The first glyph of every word but the first follows a space
+        spaced = np.zeros(len(characters), dtype=bool)
+        spaced[np.cumsum([len(word) for word in words], dtype=np.intp)[:-1]] = True
+        if np.any(~spaced[1:]):
+            self.widest_gap = max(self.widest_gap, int(gaps[1:][~spaced[1:]].max()))
+        if np.any(spaced):
+            narrowest = int(gaps[spaced].min())
+            self.narrowest_space = narrowest if self.narrowest_space is None else min(self.narrowest_space, narrowest)
+
+        self.characters.extend(characters)
+        self.templates = np.vstack([self.templates, glyphs])
+        self.norms = np.einsum('ij,ij->i', self.templates, self.templates)
+
+    def read(self, image: cv2.Mat) -> str:
+        """
+        Reads the text of an image.
+        :param image: A single line of text in a learned font, in BGR or grayscale.
+        :return: The text. Glyphs that match no learned glyph well enough read as "?".
+        """
+        if not self.characters:
+            raise ValueError("No glyphs learned yet, call learn() first.")
+        glyphs, gaps = self.__segment(image)
+        if len(glyphs) == 0:
+            return ""
+        # Squared distances of every glyph to every template at once: |g|^2 + |t|^2 - 2 g.t
+        distances = np.einsum('ij,ij->i', glyphs, glyphs)[:, np.newaxis] + self.norms - 2 * glyphs @ self.templates.T
+        best = np.argmin(distances, axis=1)
+        scores = 1 - np.sqrt(np.maximum(distances[np.arange(len(best)), best], 0) / glyphs.shape[1])
+        spaces = (gaps >= self.__space_width()).tolist()
+        text = []
+        for index, score, space in zip(best.tolist(), scores.tolist(), spaces):
+            if space:
+                text.append(" ")
+            text.append(self.characters[index] if score >= self.min_score else "?")
+        return "".join(text)
+
+    def text(self, image: cv2.Mat, config: str = None) -> str:
+        """
+        Reads the text of an image. Lets a GlyphReader be used as an engine by ocr.extract_text.
+        :param image: A single line of text in a learned font.
+        :param config: Ignored, there is nothing to configure per call.
+        :return: The text.
+        """
+        return self.read(image)
+
+    def number(self, image: cv2.Mat) -> Optional[int]:
+        """
+        Reads an integer, ignoring separators like commas and spaces.
+        :param image: A single line of digits in a learned font.
+        :return: The number, or None if the image holds no digit.
+        """
+        digits = "".join(character for character in self.read(image) if character.isdigit())
+        return int(digits) if digits else None
+
+    def __space_width(self) -> float:
+        if self.space_width is not None:
+            return self.space_width
+        if self.narrowest_space is not None and self.narrowest_space > self.widest_gap:
+            return (self.widest_gap + self.narrowest_space) / 2
+        return self.widest_gap + 2
+
+    def __segment(self, image: cv2.Mat) -> (np.ndarray, np.ndarray):
+        gray = convert_to_gray(image) if image.ndim == 3 else image
+        if self.threshold is None:
+            _, ink = cv2.threshold(gray, 0, 1, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        else:
+            _, ink = cv2.threshold(gray, self.threshold, 1, cv2.THRESH_BINARY)
+        if np.count_nonzero(ink) * 2 > ink.size:
+            ink = 1 - ink
+
+        # Runs of columns holding ink are the glyphs, the empty runs between them the gaps
+        columns = np.concatenate([[0], ink.any(axis=0).view(np.int8), [0]])
+        edges = np.diff(columns)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        gaps = np.concatenate([[0], starts[1:] - ends[:-1]])
+
+        glyphs = np.empty((len(starts), self.templates.shape[1]), dtype=np.float32)
+        tops = np.empty(len(starts), dtype=np.float32)
+        bottoms = np.empty(len(starts), dtype=np.float32)
+        for i, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+            rows = np.flatnonzero(ink[:, start:end].any(axis=1))
+            tops[i], bottoms[i] = rows[0], rows[-1] + 1
+            glyph = ink[rows[0]:rows[-1] + 1, start:end].astype(np.float32)
+            glyphs[i, :-4] = cv2.resize(glyph, self.glyph_size, interpolation=cv2.INTER_AREA).ravel()
+            glyphs[i, -4] = end - start
+            glyphs[i, -3] = rows[-1] + 1 - rows[0]
+        # Most glyphs sit on the baseline, so offsets from it tell apart look-alikes like "." and "'"
+        baseline = np.median(bottoms) if len(bottoms) else 0
+        glyphs[:, -2] = tops - baseline
+        glyphs[:, -1] = bottoms - baseline
+        glyphs[:, -4:] *= GEOMETRY_WEIGHT
+        return glyphs, gaps
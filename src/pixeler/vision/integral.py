@@ -0,0 +1,144 @@
+"""
+Summed-area tables answering "how much of this is in that rectangle" in constant time.
+"""
+from typing import Sequence, Union
+
+import cv2
+import numpy as np
+
+from src.pixeler.math.rectangle import Rectangle
+from src.pixeler.vision.color import Color
+from src.pixeler.vision.oir import mask_by_color
+from src.pixeler.vision.utils import convert_to_gray
+
+
+class IntegralIndex:
+    def __init__(self, values: cv2.Mat, sdepth: int = cv2.CV_64F):
+        """
+        Builds the summed-area table of a single-channel image in one pass.
+        Every query then reads four table entries, whatever the size of the rectangle.
+        Use from_mask(), from_color() or from_gray() to build one from a frame.
+        :param values: The single-channel image whose values are summed.
+        :param sdepth: The depth of the table. CV_32S is faster but may overflow on large bright images.
+        """
+        self.height, self.width = values.shape[:2]
+        self.table = cv2.integral(values, sdepth=sdepth)
+
+    @classmethod
+    def from_mask(cls, mask: cv2.Mat) -> 'IntegralIndex':
+        """
+        Indexes a mask so sum() and count() return the number of nonzero pixels.
+        :param mask: A single-channel mask, e.g. from mask_by_color.
+        :return: The index.
+        """
+        return cls((mask != 0).view(np.uint8), cv2.CV_32S)
+
+    @classmethod
+    def from_color(cls, image: cv2.Mat, color: Color) -> 'IntegralIndex':
+        """
+        Indexes the pixels of an image matching a color.
+        :param image: The BGR image. A Frame reuses its cached HSV conversion.
+        :param color: The HSV color range to count.
+        :return: The index.
+        """
+        return cls.from_mask(mask_by_color(image, color))
+
+    @classmethod
+    def from_gray(cls, image: cv2.Mat) -> 'IntegralIndex':
+        """
+        Indexes the brightness of an image so mean() returns the average gray level.
+        :param image: The BGR image. A Frame reuses its cached gray conversion.
+        :return: The index.
+        """
+        return cls(convert_to_gray(image) if image.ndim == 3 else image)
+
+    def sum(self, rect: Rectangle) -> float:
+        """
+        Sums the values inside a rectangle. Parts of the rectangle outside the image are ignored.
+        :param rect: The rectangle, in image coordinates.
+        :return: The sum of the values.
+        """
+        x0, y0, x1, y1 = self.__clip(rect.x, rect.y, rect.w, rect.h)
+        table = self.table
+        return (table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]).item()
+
+    def count(self, rect: Rectangle) -> int:
+        """
+        Counts the set pixels of an index built from a mask.
+        :param rect: The rectangle, in image coordinates.
+        :return: The number of set pixels.
+        """
+        return int(self.sum(rect))
+
+    def area(self, rect: Rectangle) -> int:
+        """
+        Returns the number of pixels of a rectangle that lie inside the image.
+        :param rect: The rectangle, in image coordinates.
+        :return: The number of pixels.
+        """
+        x0, y0, x1, y1 = self.__clip(rect.x, rect.y, rect.w, rect.h)
+        return (x1 - x0) * (y1 - y0)
+
+    def mean(self, rect: Rectangle) -> float:
+        """
+        Averages the values inside a rectangle. For a mask this is the fill ratio.
+        :param rect: The rectangle, in image coordinates.
+        :return: The mean value, or 0 if the rectangle is outside the image.
+        """
+        area = self.area(rect)
+        return self.sum(rect) / area if area else 0.0
+
+    def fill_ratio(self, rect: Rectangle) -> float:
+        """
+        Returns the share of set pixels inside a rectangle of an index built from a mask.
+        :param rect: The rectangle, in image coordinates.
+        :return: A ratio between 0 (empty) and 1 (full).
+        """
+        return self.mean(rect)
+
+    def sums(self, rects: Union[np.ndarray, Sequence[Rectangle]]) -> np.ndarray:
+        """
+        Sums the values inside many rectangles at once.
+        :param rects: Rectangles, or an Nx4 array of (x, y, w, h) boxes.
+        :return: The sum per rectangle.
+        """
+        x0, y0, x1, y1 = self.__clip_all(rects)
+        table = self.table
+        return table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+
+    def counts(self, rects: Union[np.ndarray, Sequence[Rectangle]]) -> np.ndarray:
+        """
+        Counts the set pixels inside many rectangles at once.
+        :param rects: Rectangles, or an Nx4 array of (x, y, w, h) boxes.
+        :return: The number of set pixels per rectangle.
+        """
+        return self.sums(rects).astype(np.int64)
+
+    def means(self, rects: Union[np.ndarray, Sequence[Rectangle]]) -> np.ndarray:
+        """
+        Averages the values inside many rectangles at once. For a mask these are the fill ratios.
+        :param rects: Rectangles, or an Nx4 array of (x, y, w, h) boxes.
+        :return: The mean per rectangle, 0 for rectangles outside the image.
+        """
+        x0, y0, x1, y1 = self.__clip_all(rects)
+        table = self.table
+        sums = table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+        areas = (x1 - x0) * (y1 - y0)
+        return np.divide(sums, areas, out=np.zeros(len(areas)), where=areas > 0)
+
+    def __clip(self, x: int, y: int, w: int, h: int) -> (int, int, int, int):
+        x0 = min(max(x, 0), self.width)
+        y0 = min(max(y, 0), self.height)
+        x1 = min(max(x + w, x0), self.width)
+        y1 = min(max(y + h, y0), self.height)
+        return x0, y0, x1, y1
+
+    def __clip_all(self, rects: Union[np.ndarray, Sequence[Rectangle]]):
+        if not isinstance(rects, np.ndarray):
+            rects = [(rect.x, rect.y, rect.w, rect.h) for rect in rects]
+        boxes = np.asarray(rects, dtype=np.int64).reshape(-1, 4)
+        x0 = np.clip(boxes[:, 0], 0, self.width)
+        y0 = np.clip(boxes[:, 1], 0, self.height)
+        x1 = np.clip(boxes[:, 0] + boxes[:, 2], x0, self.width)
+        y1 = np.clip(boxes[:, 1] + boxes[:, 3], y0, self.height)
+        return x0, y0, x1, y1
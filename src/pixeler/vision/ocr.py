@@ -2,32 +2,76 @@
 Optical Character Recognition functions for gathering text information from OpenCV images.
 """
 
+import itertools
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
 import cv2
+import numpy as np
 from pytesseract import pytesseract
 
+from src.pixeler.vision.ocr_cache import OcrCache
+from src.pixeler.vision.ocr_data import OcrData
+from src.pixeler.vision.ocr_engine import TesseractPool
+from src.pixeler.vision.oir import non_max_suppression
+from src.pixeler.vision.utils import convert, convert_to_gray
+
+# Classifiers are not safe to share between threads, so every thread keeps its own loaded copies
+_cascades = threading.local()
+_executors: Dict[int, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+_engine: Optional[TesseractPool] = None
+_cache: Optional[OcrCache] = None
+# Engines get a token for the cache key that, unlike id(), is never reused by a later engine
+_engine_tokens: "weakref.WeakKeyDictionary[object, str]" = weakref.WeakKeyDictionary()
+_engine_counter = itertools.count()
+
+
+def use_engine(engine: Optional[TesseractPool]):
+    """
+    Routes extract_text, extract_data and extract_boxes through a persistent Tesseract pool instead of
+    starting a tesseract process per call.
+    :param engine: The pool to use, or None to go back to pytesseract.
+    """
+    global _engine
+    _engine = engine
+
 
-def extract_text(image: cv2.Mat, config_options=None) -> str:
+def use_cache(cache: Optional[OcrCache]):
+    """
+    Puts a result cache in front of extract_text, extract_data and extract_boxes, so regions whose pixels
+    did not change are not recognized again.
+    :param cache: The cache to use, or None to recognize every call.
+    """
+    global _cache
+    _cache = cache
+
+
+def extract_text(image: cv2.Mat, config_options=None, engine=None) -> str:
     """
     Returns unmodified output as string from Tesseract OCR processing
     :param image:
     :param config_options:
+    :param engine: An optional engine for this call only, like a GlyphReader for a region drawn in a known font.
+    Anything with a text(image, config) method works. Defaults to the engine set by use_engine.
     :return:
     """
     config = config_options if config_options else ""
-    # By default, OpenCV stores images in BGR format and since pytesseract assumes RGB format,
-    # we need to convert from BGR to RGB format/mode:
-    img_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    return pytesseract.image_to_string(img_rgb, config=config)
+    return _cached('text', image, config, lambda: _recognize_text(image, config, engine), engine)
 
 
-def extract_data(image: cv2.Mat, config="--psm 6") -> str:
+def extract_data(image: cv2.Mat, config="--psm 6") -> OcrData:
     """
     Returns result containing box boundaries, confidences, and other information.
     :param config:
     :param image:
-    :return:
+    :return: The rows of Tesseract's output, parsed into NumPy columns. Call to_tsv() for the raw text.
     """
-    return pytesseract.image_to_data(image, config=config)
+    return _cached('data', image, config, lambda: OcrData.from_tsv(_recognize_data(image, config)))
 
 
 def extract_boxes(image: cv2.Mat, config_options=None):
@@ -38,7 +82,7 @@ def extract_boxes(image: cv2.Mat, config_options=None):
     :return:
     """
     config = config_options if config_options else ""
-    return pytesseract.image_to_boxes(image, config=config)
+    return _cached('boxes', image, config, lambda: _recognize_boxes(image, config))
 
 
 def extract_osd(image: cv2.Mat, config_options=None):
@@ -52,10 +96,158 @@ def extract_osd(image: cv2.Mat, config_options=None):
     return pytesseract.image_to_osd(image, config=config)
 
 
+def extract_data_batch(images: Sequence[cv2.Mat], config="--psm 6", padding: int = 12) -> List[OcrData]:
+    """
+    Recognizes many small regions with a single Tesseract pass instead of one pass per region.
+    The regions are stacked into one montage, each padded with its own background color so the padding
+    separates them without adding edges, then the words found are mapped back to the region they came from.
+    :param images: The regions to read, in BGR or grayscale.
+    :param config: Tesseract options for the montage. The default treats it as one block of text lines.
+    :param padding: The pixels of background around each region in the montage.
+    :return: The words of each region, like extract_data returns, with boxes relative to that region.
+    """
+    if len(images) == 0:
+        return []
+    montage, tops = _montage(images, padding)
+    words = OcrData.from_tsv(_recognize_data(montage, config)).words()
+    regions = np.searchsorted(tops, words.top + words.height / 2, side='right') - 1
+    return [words[regions == region].offset(-padding, -int(top) - padding) for region, top in enumerate(tops)]
+
+
+def extract_text_batch(images: Sequence[cv2.Mat], config="--psm 6", padding: int = 12) -> List[str]:
+    """
+    Reads the text of many small regions with a single Tesseract pass. See extract_data_batch.
+    :param images: The regions to read, in BGR or grayscale.
+    :param config: Tesseract options for the montage.
+    :param padding: The pixels of background around each region in the montage.
+    :return: The text of each region, its lines separated by newlines.
+    """
+    return ["\n".join(data.lines()) for data in extract_data_batch(images, config, padding)]
+
+
+def _montage(images: Sequence[cv2.Mat], padding: int) -> (cv2.Mat, np.ndarray):
+    crops = [cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if image.ndim == 2 else image for image in images]
+    width = max(crop.shape[1] for crop in crops) + 2 * padding
+    heights = [crop.shape[0] + 2 * padding for crop in crops]
+    tops = np.concatenate([[0], np.cumsum(heights)[:-1]]).astype(np.int64)
+    montage = np.empty((sum(heights), width, 3), dtype=np.uint8)
+    for crop, top, height in zip(crops, tops.tolist(), heights):
+        border = np.concatenate([crop[0], crop[-1], crop[:, 0], crop[:, -1]])
+        montage[top:top + height] = np.median(border, axis=0).astype(np.uint8)
+        montage[top + padding:top + padding + crop.shape[0], padding:padding + crop.shape[1]] = crop
+    return montage, tops
+
+
+def _cached(function: str, image: cv2.Mat, config: str, recognize, engine=None):
+    if _cache is None:
+        return recognize()
+    # Different engines read the same pixels differently, so they must not share cache entries
+    engine = engine if engine is not None else _engine
+    return _cache.get(f"{function}:{_engine_token(engine)}", image, config, recognize)
+
+
+def _engine_token(engine) -> str:
+    if engine is None:
+        return "pytesseract"
+    token = _engine_tokens.get(engine)
+    if token is None:
+        token = _engine_tokens.setdefault(engine, f"{type(engine).__name__}#{next(_engine_counter)}")
+    return token
+
+
+def _recognize_text(image: cv2.Mat, config: str, engine=None) -> str:
+    engine = engine if engine is not None else _engine
+    if engine is not None:
+        return engine.text(image, config)
+    # By default, OpenCV stores images in BGR format and since pytesseract assumes RGB format,
+    # we need to convert from BGR to RGB format/mode:
+    img_rgb = convert(image, cv2.COLOR_BGR2RGB)
+    return pytesseract.image_to_string(img_rgb, config=config)
+
+
+def _recognize_data(image: cv2.Mat, config: str) -> str:
+    if _engine is not None:
+        return _engine.data(image, config)
+    return pytesseract.image_to_data(image, config=config)
+
+
+def _recognize_boxes(image: cv2.Mat, config: str) -> str:
+    if _engine is not None:
+        return _engine.boxes(image, config)
+    return pytesseract.image_to_boxes(image, config=config)
+
+
+def load_cascade(cascade_file: Union[str, Path]) -> cv2.CascadeClassifier:
+    """
+    Returns a cascade classifier, parsing its XML file only the first time a thread asks for it.
+    :param cascade_file: The path to the cascade XML file.
+    :return: The loaded classifier, owned by the calling thread.
+    """
+    key = str(cascade_file)
+    loaded = getattr(_cascades, 'loaded', None)
+    if loaded is None:
+        loaded = _cascades.loaded = {}
+    cascade = loaded.get(key)
+    if cascade is None:
+        cascade = cv2.CascadeClassifier(key)
+        if cascade.empty():
+            raise ValueError(f"Could not load cascade {cascade_file}.")
+        loaded[key] = cascade
+    return cascade
+
+
 def detect_objects(image: cv2.Mat, cascade_file, scaleFactor=1.1, minNeighbors=5):
-    cascade = cv2.CascadeClassifier(cascade_file)
+    cascade = load_cascade(cascade_file)
     # Convert to grayscale for object detection
-    gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    gray_image = convert_to_gray(image)
     # Detect objects
     objects = cascade.detectMultiScale(gray_image, scaleFactor=scaleFactor, minNeighbors=minNeighbors)
     return objects
+
+
+def detect_objects_tiled(image: cv2.Mat, cascade_file, scaleFactor=1.1, minNeighbors=5, tile_size: int = 512,
+                         overlap: int = 64, workers: int = None, merge_overlap: float = 0.3) -> np.ndarray:
+    """
+    Detects objects in overlapping tiles on several threads, then merges the detections.
+    Objects up to `overlap` pixels wide and high are always fully inside at least one tile. Larger
+    objects may be missed where they cross a tile border.
+    :param image: The image to search, in BGR or grayscale.
+    :param cascade_file: The path to the cascade XML file.
+    :param scaleFactor: How much the image size is reduced at each image scale.
+    :param minNeighbors: How many neighbors each candidate rectangle should have to retain it.
+    :param tile_size: The width and height of a tile, overlap included.
+    :param overlap: How many pixels neighbouring tiles share.
+    :param workers: The number of threads. Defaults to the number of CPUs.
+    :param merge_overlap: The intersection-over-union above which detections from different tiles are merged.
+    :return: An (N, 4) array of (x, y, w, h) boxes, like detect_objects.
+    """
+    if overlap >= tile_size:
+        raise ValueError("overlap must be smaller than tile_size.")
+    gray_image = convert_to_gray(image) if image.ndim == 3 else image
+    height, width = gray_image.shape[:2]
+    step = tile_size - overlap
+    origins = [(x, y) for y in range(0, max(height - overlap, 1), step) for x in range(0, max(width - overlap, 1), step)]
+
+    def detect_tile(origin):
+        x, y = origin
+        tile = gray_image[y:y + tile_size, x:x + tile_size]
+        objects = load_cascade(cascade_file).detectMultiScale(tile, scaleFactor=scaleFactor,
+                                                              minNeighbors=minNeighbors)
+        return np.asarray(objects, dtype=np.int32).reshape(-1, 4) + np.array((x, y, 0, 0), dtype=np.int32)
+
+    boxes = np.concatenate(list(_executor(workers).map(detect_tile, origins)))
+    if len(boxes) == 0:
+        return boxes
+    # Duplicates come from the same object seen in two tiles, so prefer the larger, less cropped box
+    keep = non_max_suppression(boxes, boxes[:, 2] * boxes[:, 3], merge_overlap)
+    return boxes[np.sort(keep)]
+
+
+def _executor(workers: int = None) -> ThreadPoolExecutor:
+    # Worker threads live on between calls so their loaded cascades do too
+    workers = workers or os.cpu_count() or 1
+    with _executors_lock:
+        executor = _executors.get(workers)
+        if executor is None:
+            executor = _executors[workers] = ThreadPoolExecutor(workers, thread_name_prefix="cascade")
+        return executor
@@ -0,0 +1,86 @@
+"""
+A cache of OCR results keyed by the pixels they were read from.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+import cv2
+import numpy as np
+
+
+class OcrCache:
+    def __init__(self, maxsize: int = 256):
+        """
+        Remembers OCR results so an unchanged region is only recognized once.
+        Entries are keyed by a hash of the pixels, the image shape, the config and the kind of result, so any
+        change to the region misses the cache. The least recently used entries are evicted first.
+        :param maxsize: The most results kept.
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        self.maxsize = maxsize
+        self.entries: OrderedDict[bytes, Any] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def key(function: str, image: cv2.Mat, config: str) -> bytes:
+        """
+        Computes the cache key of a recognition.
+        :param function: The kind of result, e.g. "text" or "data".
+        :param image: The image recognized.
+        :param config: The Tesseract options.
+        :return: A 16-byte digest.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{function}\0{config}\0{image.shape}\0{image.dtype}".encode())
+        digest.update(np.ascontiguousarray(image).data)
+        return digest.digest()
+
+    def get(self, function: str, image: cv2.Mat, config: str, compute: Callable[[], Any]) -> Any:
+        """
+        Returns the cached result of a recognition, computing and storing it on a miss.
+        :param function: The kind of result, e.g. "text" or "data".
+        :param image: The image to recognize.
+        :param config: The Tesseract options.
+        :param compute: Runs the recognition on a miss.
+        :return: The result. Treat it as read-only, it is shared by every caller.
+        """
+        key = self.key(function, image, config)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+        # Recognize outside the lock so other threads can keep hitting the cache meanwhile
+        result = compute()
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return result
+
+    def hit_rate(self) -> float:
+        """
+        Returns the share of lookups answered from the cache.
+        :return: A ratio between 0 and 1, 0 before any lookup.
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        """
+        Drops every entry and resets the counters.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,160 @@
+"""
+Tesseract word data parsed once into NumPy columns.
+"""
+from typing import List, Union
+
+import numpy as np
+
+from src.pixeler.math.rectangle import Rectangle
+
+COLUMNS = ('level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num', 'left', 'top', 'width', 'height')
+WORD_LEVEL = 5
+
+
+class OcrData:
+    """
+    The rows of Tesseract's image_to_data output, one NumPy array per column plus a list of texts.
+    Rows are pages, blocks, paragraphs, lines and words as Tesseract reports them. Filters select rows for
+    all columns at once and return a new OcrData, so results can be narrowed without touching strings.
+    """
+    __slots__ = COLUMNS + ('conf', 'text')
+
+    def __init__(self, columns: np.ndarray, conf: np.ndarray, text: List[str]):
+        """
+        :param columns: An (N, 10) int array holding the columns of COLUMNS in order.
+        :param conf: The confidence of each row, from 0 to 100, or -1 for rows that are not words.
+        :param text: The text of each row, empty for rows that are not words.
+        """
+        for i, name in enumerate(COLUMNS):
+            setattr(self, name, columns[:, i])
+        self.conf = conf
+        self.text = text
+
+    @classmethod
+    def from_tsv(cls, tsv: str) -> 'OcrData':
+        """
+        Parses the TSV output of Tesseract.
+        :param tsv: The output of image_to_data, header included.
+        :return: The parsed rows.
+        """
+        rows = [line.split("\t", 11) for line in tsv.splitlines()[1:] if line]
+        if not rows:
+            return cls.empty()
+        # Numpy converts each numeric column in one call. Confidences keep every decimal Tesseract printed
+        columns = np.array([row[:10] for row in rows], dtype=np.int32)
+        conf = np.array([row[10] for row in rows], dtype=np.float64)
+        text = [row[11] if len(row) > 11 else "" for row in rows]
+        return cls(columns, conf, text)
+
+    @classmethod
+    def empty(cls) -> 'OcrData':
+        """
+        Returns a result without rows.
+        """
+        return cls(np.empty((0, len(COLUMNS)), dtype=np.int32), np.empty(0, dtype=np.float64), [])
+
+    def __len__(self):
+        return len(self.text)
+
+    def __getitem__(self, selection: Union[int, slice, np.ndarray]) -> 'OcrData':
+        """
+        Selects rows by index, slice, index array or boolean mask.
+        """
+        if isinstance(selection, (int, np.integer)):
+            selection = slice(selection, selection + 1 if selection != -1 else None)
+        columns = self.columns()[selection]
+        if isinstance(selection, slice):
+            text = self.text[selection]
+        else:
+            indices = np.flatnonzero(selection) if np.asarray(selection).dtype == bool else np.asarray(selection)
+            text = [self.text[i] for i in indices.tolist()]
+        return OcrData(columns, self.conf[selection], text)
+
+    def __repr__(self):
+        return f"OcrData({len(self)} rows, {np.count_nonzero(self.level == WORD_LEVEL)} words)"
+
+    def columns(self) -> np.ndarray:
+        """
+        Returns the numeric columns of COLUMNS as one (N, 10) array.
+        """
+        return np.column_stack([getattr(self, name) for name in COLUMNS]).reshape(-1, len(COLUMNS))
+
+    @property
+    def boxes(self) -> np.ndarray:
+        """The boxes of the rows as an (N, 4) array of (x, y, w, h)."""
+        return np.column_stack([self.left, self.top, self.width, self.height]).reshape(-1, 4)
+
+    def words(self) -> 'OcrData':
+        """
+        Keeps the rows that are recognized words.
+        :return: The words.
+        """
+        return self[(self.level == WORD_LEVEL) & (self.conf >= 0)
+                    & np.array([bool(text.strip()) for text in self.text], dtype=bool).reshape(-1)]
+
+    def filter(self, min_conf: float) -> 'OcrData':
+        """
+        Keeps the rows Tesseract is confident about. Rows that are not words have a confidence of -1.
+        :param min_conf: The lowest confidence to keep, from 0 to 100.
+        :return: The confident rows.
+        """
+        return self[self.conf >= min_conf]
+
+    def within(self, rect: Rectangle, partial: bool = False) -> 'OcrData':
+        """
+        Keeps the rows inside a rectangle.
+        :param rect: The rectangle, in the coordinates of the recognized image.
+        :param partial: Also keeps rows that only overlap the rectangle.
+        :return: The rows inside the rectangle.
+        """
+        right = self.left + self.width
+        bottom = self.top + self.height
+        if partial:
+            keep = ((self.left < rect.x + rect.w) & (right > rect.x)
+                    & (self.top < rect.y + rect.h) & (bottom > rect.y))
+        else:
+            keep = ((self.left >= rect.x) & (right <= rect.x + rect.w)
+                    & (self.top >= rect.y) & (bottom <= rect.y + rect.h))
+        return self[keep]
+
+    def offset(self, dx: int, dy: int) -> 'OcrData':
+        """
+        Moves every box, e.g. to turn boxes of a cropped region into boxes of the whole screenshot.
+        :param dx: The distance to move right.
+        :param dy: The distance to move down.
+        :return: The moved rows.
+        """
+        columns = self.columns()
+        columns[:, COLUMNS.index('left')] += dx
+        columns[:, COLUMNS.index('top')] += dy
+        return OcrData(columns, self.conf, self.text)
+
+    def rectangles(self) -> List[Rectangle]:
+        """
+        Converts the boxes to Rectangles.
+        :return: A Rectangle per row.
+        """
+        return [Rectangle(x, y, w, h) for x, y, w, h in self.boxes.tolist()]
+
+    def lines(self) -> List[str]:
+        """
+        Joins the words into their text lines, in reading order.
+        :return: The text of each line holding a word.
+        """
+        words = self.words()
+        keys = zip(words.page_num.tolist(), words.block_num.tolist(), words.par_num.tolist(), words.line_num.tolist())
+        lines = {}
+        for key, text in zip(keys, words.text):
+            lines.setdefault(key, []).append(text)
+        return [" ".join(line) for line in lines.values()]
+
+    def to_tsv(self) -> str:
+        """
+        Formats the rows back into Tesseract's TSV output.
+        :return: The TSV, header included.
+        """
+        header = "\t".join(COLUMNS + ('conf', 'text'))
+        # 15 significant digits print back any confidence Tesseract wrote, and whole ones without a decimal point
+        rows = ["\t".join(map(str, numbers)) + f"\t{conf:.15g}\t{text}"
+                for numbers, conf, text in zip(self.columns().tolist(), self.conf.tolist(), self.text)]
+        return "\n".join([header] + rows) + "\n"
@@ -0,0 +1,154 @@
+"""
+A pool of long-lived Tesseract instances that keep their language models loaded between calls.
+"""
+import shlex
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from src.pixeler.vision.utils import convert
+
+TSV_HEADER = "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext\n"
+
+
+class TesseractPool:
+    def __init__(self, workers: int = 4, lang: str = "eng", tessdata: str = None):
+        """
+        Runs Tesseract in-process through tesserocr instead of starting a tesseract process per call.
+        Every thread using the pool gets its own Tesseract instance per configuration, created on first use
+        and reused after. Tesseract releases the GIL while recognizing, so threads recognize in parallel.
+        Requires the optional tesserocr package.
+        :param workers: The number of threads map() recognizes on.
+        :param lang: The default language, used when a config has no -l option.
+        :param tessdata: The tessdata directory. Defaults to the one tesserocr was built with.
+        """
+        try:
+            import tesserocr
+        except ImportError as e:
+            raise ImportError("TesseractPool requires tesserocr, install it with `pip install tesserocr`.") from e
+        self.tesserocr = tesserocr
+        self.lang = lang
+        self.tessdata = tessdata
+        self.local = threading.local()
+        self.apis: List = []
+        self.lock = threading.Lock()
+        self.configs: Dict[str, Tuple] = {}
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="tesseract")
+
+    def text(self, image: cv2.Mat, config: str = "") -> str:
+        """
+        Recognizes the text of an image, like pytesseract.image_to_string.
+        :param image: The BGR or grayscale image.
+        :param config: Tesseract options, e.g. "--psm 7 -c tessedit_char_whitelist=0123456789".
+        :return: The text.
+        """
+        api = self.__prepare(image, config)
+        return api.GetUTF8Text()
+
+    def data(self, image: cv2.Mat, config: str = "") -> str:
+        """
+        Recognizes the words of an image with their boxes and confidences, like pytesseract.image_to_data.
+        :param image: The BGR or grayscale image.
+        :param config: Tesseract options.
+        :return: Tesseract's TSV output, header included.
+        """
+        api = self.__prepare(image, config)
+        return TSV_HEADER + api.GetTSVText(0)
+
+    def boxes(self, image: cv2.Mat, config: str = "") -> str:
+        """
+        Recognizes the characters of an image with their boxes, like pytesseract.image_to_boxes.
+        :param image: The BGR or grayscale image.
+        :param config: Tesseract options.
+        :return: Tesseract's box file output.
+        """
+        api = self.__prepare(image, config)
+        return api.GetBoxText(0)
+
+    def map(self, images: Sequence[cv2.Mat], config: str = "", output: str = "text") -> list:
+        """
+        Recognizes several images in parallel on the pool's threads.
+        :param images: The images.
+        :param config: Tesseract options, shared by every image.
+        :param output: "text", "data" or "boxes", naming the method each image goes through.
+        :return: The results, in the order of the images.
+        """
+        recognize = {'text': self.text, 'data': self.data, 'boxes': self.boxes}[output]
+        return list(self.executor.map(lambda image: recognize(image, config), images))
+
+    def close(self):
+        """
+        Stops the threads and frees every Tesseract instance.
+        """
+        self.executor.shutdown()
+        with self.lock:
+            for api in self.apis:
+                api.End()
+            self.apis.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __prepare(self, image: cv2.Mat, config: str):
+        api = self.__api(config)
+        if image.ndim == 3:
+            image = convert(image, cv2.COLOR_BGR2RGB if image.shape[2] == 3 else cv2.COLOR_BGRA2RGB)
+        image = np.ascontiguousarray(image)
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        # The raw pixels go straight to Tesseract, without a temporary file or image encoding
+        api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+        return api
+
+    def __api(self, config: str):
+        apis = getattr(self.local, 'apis', None)
+        if apis is None:
+            apis = self.local.apis = {}
+        api = apis.get(config)
+        if api is None:
+            lang, oem, psm, variables = self.__parse(config)
+            kwargs = {'path': self.tessdata} if self.tessdata else {}
+            api = self.tesserocr.PyTessBaseAPI(lang=lang, oem=oem, psm=psm, variables=variables, **kwargs)
+            apis[config] = api
+            with self.lock:
+                self.apis.append(api)
+        return api
+
+    def __parse(self, config: str) -> Tuple:
+        parsed = self.configs.get(config)
+        if parsed is not None:
+            return parsed
+        lang = self.lang
+        oem = self.tesserocr.OEM.DEFAULT
+        psm = self.tesserocr.PSM.AUTO
+        variables = {}
+        options = shlex.split(config)
+        i = 0
+        while i < len(options):
+            option = options[i]
+            if i + 1 >= len(options):
+                raise ValueError(f"Missing value for {option} in Tesseract config {config!r}.")
+            value = options[i + 1]
+            if option == "--psm":
+                psm = int(value)
+            elif option == "--oem":
+                oem = int(value)
+            elif option == "-l":
+                lang = value
+            elif option == "--dpi":
+                variables['user_defined_dpi'] = value
+            elif option == "-c" and "=" in value:
+                name, _, setting = value.partition("=")
+                variables[name] = setting
+            else:
+                raise ValueError(f"Unsupported option {option} in Tesseract config {config!r}.")
+            i += 2
+        parsed = (lang, oem, psm, variables)
+        self.configs[config] = parsed
+        return parsed
@@ -4,18 +4,21 @@ Optical Image Recognition functions for image recognition and drawing.
 from typing import Sequence
 
 import cv2
+import numpy as np
 
 from src.pixeler.vision.color import Color
+from src.pixeler.vision.frame import Frame
+from src.pixeler.vision.utils import convert
 
 
 def mask_by_color(image: cv2.Mat, color: Color) -> cv2.Mat:
     """
     Overlays an existing image with the shapes found by a given color.
-    :param image: The original image
+    :param image: The original image. A Frame reuses its cached HSV conversion.
     :param color: The color to mask from
     :return: A masked Image
     """
-    hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    hsv = convert(image, cv2.COLOR_BGR2HSV)
     return cv2.inRange(hsv, color.lower, color.upper)
 
 
@@ -43,6 +46,180 @@ def find_template_in_image(image: cv2.Mat, template: cv2.Mat, method=cv2.TM_CCOE
     return best_match_location, max_val
 
 
+def find_template_pyramid(image: cv2.Mat, template: cv2.Mat, method=cv2.TM_CCOEFF_NORMED, levels: int = 2,
+                          candidates: int = 3, min_template_size: int = 8,
+                          small_template: cv2.Mat = None) -> (Sequence[int], float):
+    """
+    Coarse-to-fine template matching. The template is first matched on a copy of the image downscaled
+    by 2^levels, then only the best candidates are refined at full resolution around their location.
+    More levels are faster, more candidates are more robust to look-alikes at the coarse level.
+
+    :param image: The larger image in which to search (as a cv2 Mat). A Frame reuses its cached downscales.
+    :param template: The template image to search for (as a cv2 Mat), with the same channels as the image.
+    :param method: The matching method to use (default is cv2.TM_CCOEFF_NORMED).
+    :param levels: The number of times the image is halved for the coarse search. 0 matches at full resolution.
+    :param candidates: The number of coarse matches refined at full resolution.
+    :param min_template_size: Fewer levels are used if the template would shrink below this many pixels.
+    :param small_template: The template already downscaled by 2^levels, e.g. precomputed by a TemplateLibrary.
+    When given, levels is used as is.
+    :return: The top-left corner (x, y) of the best match location and its score.
+    """
+    th, tw = template.shape[:2]
+    if small_template is None:
+        levels = pyramid_levels(template, levels, min_template_size)
+    if levels == 0:
+        result = cv2.matchTemplate(image, template, method)
+        return _best_match(result, method)
+
+    factor = 2 ** levels
+    small_image = _downscale(image, factor)
+    if small_template is None:
+        small_template = _downscale(template, factor)
+    coarse = cv2.matchTemplate(small_image, small_template, method)
+
+    best_location, best_score = None, None
+    for x, y in _top_locations(coarse, method, candidates, small_template.shape[:2]):
+        # Search a window of one coarse pixel plus rounding slack around the scaled-up candidate
+        x0, y0 = max(x * factor - factor, 0), max(y * factor - factor, 0)
+        x1 = min(x * factor + factor, image.shape[1] - tw)
+        y1 = min(y * factor + factor, image.shape[0] - th)
+        if x1 < x0 or y1 < y0:
+            continue
+        fine = cv2.matchTemplate(image[y0:y1 + th, x0:x1 + tw], template, method)
+        (fx, fy), score = _best_match(fine, method)
+        if best_score is None or _is_better(score, best_score, method):
+            best_location, best_score = (x0 + fx, y0 + fy), score
+    return best_location, best_score
+
+
+def pyramid_levels(template: cv2.Mat, levels: int, min_template_size: int = 8) -> int:
+    """
+    Returns how many of the requested pyramid levels a template supports before shrinking below a minimum size.
+    :param template: The template image.
+    :param levels: The requested number of levels.
+    :param min_template_size: The smallest width or height the downscaled template may have.
+    :return: The usable number of levels.
+    """
+    th, tw = template.shape[:2]
+    while levels > 0 and min(th, tw) >> levels < min_template_size:
+        levels -= 1
+    return levels
+
+
+def find_all_templates(image: cv2.Mat, template: cv2.Mat, threshold: float = 0.8, method=cv2.TM_CCOEFF_NORMED,
+                       overlap: float = 0.3, max_matches: int = None) -> (np.ndarray, np.ndarray):
+    """
+    Search for every occurrence of the template within the given image.
+    The response map is computed and thresholded once, returning straight away when nothing passes. Candidates
+    that are not the peak of a small neighborhood are dropped in one vectorized pass, and the remaining peaks
+    go through non-maximum suppression.
+
+    :param image: The larger image in which to search (as a cv2 Mat).
+    :param template: The template image to search for (as a cv2 Mat).
+    :param threshold: The score a match needs. For TM_SQDIFF methods, the highest score a match may have.
+    :param method: The matching method to use (default is cv2.TM_CCOEFF_NORMED).
+    :param overlap: The highest intersection-over-union two reported matches may have.
+    :param max_matches: An optional limit on the number of matches, keeping the best.
+    :return: An (N, 4) int array of (x, y, w, h) boxes and an (N,) array of their scores, best first.
+    """
+    th, tw = template.shape[:2]
+    result = cv2.matchTemplate(image, template, method)
+    # Work on "higher is better" scores
+    scores = -result if method in [cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED] else result
+    limit = -threshold if method in [cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED] else threshold
+
+    ys, xs = np.nonzero(scores >= limit)
+    if len(ys) == 0:
+        return np.empty((0, 4), dtype=np.int64), np.empty(0, dtype=result.dtype)
+
+    # Boxes shifted by less than this fraction of the template always overlap more than `overlap`,
+    # so a candidate beaten inside that rectangle would be suppressed anyway. A rectangular kernel is
+    # separable, and it only runs over the area holding candidates.
+    shrink = 1 - np.sqrt(2 * overlap / (1 + overlap))
+    rx, ry = max(int(tw * shrink), 0), max(int(th * shrink), 0)
+    if rx or ry:
+        x0, x1 = max(xs.min() - rx, 0), min(xs.max() + rx + 1, scores.shape[1])
+        y0, y1 = max(ys.min() - ry, 0), min(ys.max() + ry + 1, scores.shape[0])
+        area = np.ascontiguousarray(scores[y0:y1, x0:x1])
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (2 * rx + 1, 2 * ry + 1))
+        peaks = area[ys - y0, xs - x0] >= cv2.dilate(area, kernel)[ys - y0, xs - x0]
+        ys, xs = ys[peaks], xs[peaks]
+
+    boxes = np.column_stack([xs, ys, np.full(len(xs), tw), np.full(len(xs), th)])
+    keep = non_max_suppression(boxes, scores[ys, xs], overlap, max_matches)
+    return boxes[keep], result[ys[keep], xs[keep]]
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, overlap: float = 0.3,
+                        max_boxes: int = None) -> np.ndarray:
+    """
+    Greedy non-maximum suppression: keeps the best box and drops every box overlapping it, then repeats.
+    The overlaps against each kept box are computed for all remaining boxes at once.
+
+    :param boxes: An (N, 4) array of (x, y, w, h) boxes.
+    :param scores: An (N,) array of scores, higher is better.
+    :param overlap: The highest intersection-over-union two kept boxes may have.
+    :param max_boxes: An optional limit on the number of boxes kept.
+    :return: The indices of the kept boxes, best first.
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.intp)
+    x1 = boxes[:, 0].astype(np.float64)
+    y1 = boxes[:, 1].astype(np.float64)
+    x2 = x1 + boxes[:, 2]
+    y2 = y1 + boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-scores, kind='stable')
+    keep = []
+    while order.size > 0 and (max_boxes is None or len(keep) < max_boxes):
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        width = np.clip(np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0, None)
+        height = np.clip(np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0, None)
+        intersection = width * height
+        union = areas[best] + areas[rest] - intersection
+        order = rest[intersection <= overlap * np.maximum(union, np.finfo(np.float64).tiny)]
+    return np.array(keep, dtype=np.intp)
+
+
+def _best_match(result: cv2.Mat, method: int) -> (Sequence[int], float):
+    min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+    if method in [cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED]:
+        return min_loc, min_val
+    return max_loc, max_val
+
+
+def _is_better(score: float, other: float, method: int) -> bool:
+    if method in [cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED]:
+        return score < other
+    return score > other
+
+
+def _downscale(image: cv2.Mat, factor: int) -> cv2.Mat:
+    if isinstance(image, Frame):
+        return image.downscaled(factor)
+    size = (max(image.shape[1] // factor, 1), max(image.shape[0] // factor, 1))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def _top_locations(result: cv2.Mat, method: int, count: int, template_size: Sequence[int]) -> list:
+    """
+    Returns the locations of the best `count` peaks of a match result, at least half a template apart.
+    """
+    if method in [cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED]:
+        result = -result
+    result = result.copy()
+    h, w = max(template_size[0] // 2, 1), max(template_size[1] // 2, 1)
+    locations = []
+    for _ in range(count):
+        _, max_val, _, (x, y) = cv2.minMaxLoc(result)
+        if not np.isfinite(max_val):
+            break
+        locations.append((x, y))
+        result[max(y - h, 0):y + h + 1, max(x - w, 0):x + w + 1] = -np.inf
+    return locations
+
+
 def draw_rectangle(image: cv2.Mat, top_left: tuple, height: float, width: float, color: Color,
                    thickness: int = 2, line_type: int = cv2.FILLED):
     """
@@ -0,0 +1,83 @@
+"""
+Classifies every pixel against a whole set of colors in one pass.
+"""
+from typing import Dict, Hashable, Mapping, Sequence, Union
+
+import cv2
+import numpy as np
+
+from src.pixeler.vision.color import Color
+from src.pixeler.vision.utils import convert
+
+
+class ColorPalette:
+    def __init__(self, colors: Union[Sequence[Color], Mapping[Hashable, Color]], hsv: bool = True):
+        """
+        Compiles a set of color ranges into per-channel lookup tables.
+        A Color range is a box in color space, so a pixel is inside it exactly when each of its channels is
+        inside the range for that channel. Each table maps a channel value to the bitmask of the colors
+        accepting it, and ANDing the three lookups labels a pixel with every color it matches.
+        :param colors: The colors to classify, as a list or as a mapping of names to colors.
+        :param hsv: Matches in HSV like oir.mask_by_color. Otherwise matches raw BGR like utils.mask_to_color.
+        """
+        if isinstance(colors, Mapping):
+            self.names = list(colors.keys())
+            colors = list(colors.values())
+        else:
+            self.names = list(range(len(colors)))
+        if not 0 < len(colors) <= 64:
+            raise ValueError("A palette holds between 1 and 64 colors.")
+        self.colors = list(colors)
+        self.hsv = hsv
+        self.dtype = next(dtype for dtype in (np.uint8, np.uint16, np.uint32, np.uint64)
+                          if np.iinfo(dtype).bits >= len(colors))
+
+        self.tables = np.zeros((3, 256), dtype=self.dtype)
+        for bit, color in enumerate(self.colors):
+            for channel in range(3):
+                lower = max(int(np.ceil(color.lower[channel])), 0)
+                upper = min(int(np.floor(color.upper[channel])), 255)
+                self.tables[channel, lower:upper + 1] |= self.dtype(1 << bit)
+        # cv2.LUT maps all three channels in one call, but only into 8-bit tables
+        self.lut = self.tables.T.reshape(256, 1, 3).copy() if self.dtype == np.uint8 else None
+
+    def classify(self, image: cv2.Mat) -> np.ndarray:
+        """
+        Labels every pixel with the bitmask of the palette colors it matches. Bit i is set for the i-th color.
+        :param image: The BGR image to classify. A Frame reuses its cached HSV conversion.
+        :return: A label per pixel, in the smallest unsigned type holding one bit per color.
+        """
+        pixels = convert(image, cv2.COLOR_BGR2HSV) if self.hsv else image
+        if self.lut is not None:
+            mapped = cv2.LUT(pixels, self.lut)
+            labels = np.bitwise_and(mapped[:, :, 0], mapped[:, :, 1])
+            return np.bitwise_and(labels, mapped[:, :, 2], out=labels)
+        labels = self.tables[0][pixels[:, :, 0]]
+        labels &= self.tables[1][pixels[:, :, 1]]
+        labels &= self.tables[2][pixels[:, :, 2]]
+        return labels
+
+    def mask(self, labels: np.ndarray, name: Hashable) -> cv2.Mat:
+        """
+        Extracts the mask of one color from classified labels.
+        :param labels: Labels returned by classify().
+        :param name: The name, or list index, of the color.
+        :return: A mask that is 255 where the color matches, like cv2.inRange returns.
+        """
+        bit = self.dtype(1 << self.names.index(name))
+        return ((labels & bit) != 0).view(np.uint8) * np.uint8(255)
+
+    def counts(self, labels: np.ndarray) -> Dict[Hashable, int]:
+        """
+        Counts the pixels matching each color.
+        :param labels: Labels returned by classify().
+        :return: The number of matching pixels per color name.
+        """
+        if len(self.colors) <= 16:
+            # One histogram pass over the labels, then split each label's count onto its bits
+            histogram = np.bincount(labels.ravel(), minlength=1 << len(self.colors))
+            bits = (np.arange(len(histogram))[:, np.newaxis] >> np.arange(len(self.colors))) & 1
+            totals = histogram @ bits
+        else:
+            totals = [np.count_nonzero(labels & self.dtype(1 << bit)) for bit in range(len(self.colors))]
+        return {name: int(total) for name, total in zip(self.names, totals)}
@@ -0,0 +1,152 @@
+"""
+Recognizes which known screen a frame shows by comparing perceptual hashes.
+"""
+from pathlib import Path
+from typing import Hashable, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from src.pixeler.math.rectangle import Rectangle
+from src.pixeler.vision.utils import perceptual_hash
+
+
+class HashIndex:
+    """
+    Reference hashes packed into a NumPy uint64 matrix, one row per hash.
+    A query XORs itself against every row and counts the differing bits with np.bitwise_count, so the
+    whole index is scanned in a few vectorized passes instead of walking Python objects.
+    """
+
+    def __init__(self, bits: int = 64):
+        """
+        :param bits: The number of bits of the hashes. Longer hashes span several uint64 words per row.
+        """
+        self.words = max(-(-bits // 64), 1)
+        self.hashes = np.empty((64, self.words), dtype=np.uint64)
+        self.values: List[Hashable] = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, hash_value: int, value: Hashable):
+        """
+        Adds a value under a hash.
+        :param hash_value: The hash.
+        :param value: The value returned by searches.
+        """
+        size = len(self.values)
+        if size == len(self.hashes):
+            # Grow by doubling so adding many references stays linear
+            self.hashes = np.concatenate([self.hashes, np.empty_like(self.hashes)])
+        self.hashes[size] = self.__pack(hash_value)
+        self.values.append(value)
+
+    def distances(self, hash_value: int) -> np.ndarray:
+        """
+        Computes the Hamming distance of a hash to every indexed hash.
+        :param hash_value: The hash.
+        :return: The distances, in the order the hashes were added.
+        """
+        differing = np.bitwise_count(self.hashes[:len(self.values)] ^ self.__pack(hash_value))
+        return differing.sum(axis=1, dtype=np.int64) if self.words > 1 else differing[:, 0].astype(np.int64)
+
+    def search(self, hash_value: int, max_distance: int) -> List[Tuple[int, Hashable]]:
+        """
+        Finds every value whose hash is within a distance.
+        :param hash_value: The hash to search around.
+        :param max_distance: The largest Hamming distance to report.
+        :return: (distance, value) pairs, closest first.
+        """
+        distances = self.distances(hash_value)
+        found = np.flatnonzero(distances <= max_distance)
+        found = found[np.argsort(distances[found], kind='stable')]
+        return [(int(distances[i]), self.values[i]) for i in found.tolist()]
+
+    def nearest(self, hash_value: int, max_distance: int = None) -> Tuple[Optional[int], Optional[Hashable]]:
+        """
+        Finds the value with the closest hash.
+        :param hash_value: The hash to search around.
+        :param max_distance: An optional largest Hamming distance to accept.
+        :return: The distance and the value, or (None, None) if nothing is close enough.
+        """
+        if not self.values:
+            return None, None
+        distances = self.distances(hash_value)
+        best = int(np.argmin(distances))
+        if max_distance is not None and distances[best] > max_distance:
+            return None, None
+        return int(distances[best]), self.values[best]
+
+    def __pack(self, hash_value: int) -> np.ndarray:
+        return np.frombuffer(hash_value.to_bytes(self.words * 8, 'big'), dtype='>u8').astype(np.uint64)
+
+
+class StateRecognizer:
+    def __init__(self, region: Rectangle = None, hash_size: int = 8, max_distance: int = 10):
+        """
+        Tells which of the known states (login, menu, bank...) a frame shows.
+        Reference screenshots are hashed once. Recognizing a frame then costs one hash and a vectorized scan.
+        :param region: An optional part of the frame to compare, relative to its top-left corner.
+        Restricting it to a stable area, like a title bar, ignores the changing parts of the screen.
+        :param hash_size: The hash has hash_size * hash_size bits.
+        :param max_distance: The largest Hamming distance at which a frame still counts as a known state.
+        """
+        self.region = region
+        self.hash_size = hash_size
+        self.max_distance = max_distance
+        self.index = HashIndex(hash_size * hash_size)
+
+    def __len__(self):
+        return len(self.index)
+
+    def hash(self, image: cv2.Mat) -> int:
+        """
+        Hashes the compared region of a frame.
+        :param image: The frame.
+        :return: The perceptual hash.
+        """
+        if self.region is not None:
+            image = image[self.region.y:self.region.y + self.region.h, self.region.x:self.region.x + self.region.w]
+        return perceptual_hash(image, self.hash_size)
+
+    def add(self, state: Hashable, image: cv2.Mat):
+        """
+        Adds a reference screenshot of a state. A state may have several references.
+        :param state: The name of the state.
+        :param image: The reference screenshot, the same size as the frames to recognize.
+        """
+        self.index.add(self.hash(image), state)
+
+    def load_directory(self, directory: Union[str, Path], pattern: str = "*.png"):
+        """
+        Adds every image of a directory as a reference. Images in a subdirectory are references of the state
+        named after the subdirectory, other images of the state named after their file name without extension.
+        :param directory: The directory containing the references.
+        :param pattern: A glob pattern selecting the images.
+        """
+        root = Path(directory)
+        for path in sorted(root.rglob(pattern)):
+            image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+            if image is None:
+                raise ValueError(f"Could not read reference {path}.")
+            self.add(path.stem if path.parent == root else path.parent.name, image)
+
+    def recognize(self, image: cv2.Mat) -> Tuple[Optional[Hashable], Optional[int]]:
+        """
+        Finds the known state closest to a frame.
+        :param image: The frame.
+        :return: The state and its distance, or (None, None) if no state is within max_distance.
+        """
+        distance, state = self.index.nearest(self.hash(image), self.max_distance)
+        return state, distance
+
+    def candidates(self, image: cv2.Mat, max_distance: int = None) -> List[Tuple[Hashable, int]]:
+        """
+        Lists every known state close to a frame.
+        :param image: The frame.
+        :param max_distance: The largest distance to report. Defaults to the recognizer's max_distance.
+        :return: (state, distance) pairs, closest first. A state appears once per matching reference.
+        """
+        max_distance = self.max_distance if max_distance is None else max_distance
+        return [(state, distance) for distance, state in self.index.search(self.hash(image), max_distance)]
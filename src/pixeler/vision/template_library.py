@@ -0,0 +1,180 @@
+"""
+A set of templates that are preprocessed once and matched together against a frame.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Union
+
+import cv2
+import numpy as np
+
+from src.pixeler.vision.frame import Frame
+from src.pixeler.vision.oir import find_all_templates, find_template_pyramid, pyramid_levels
+from src.pixeler.vision.utils import convert_to_gray, load_mat_from_file
+
+# Names are Python strings, a fixed-width string field would cut long names short
+MATCH_DTYPE = np.dtype([
+    ('name', 'O'),
+    ('x', '<i4'),
+    ('y', '<i4'),
+    ('w', '<i4'),
+    ('h', '<i4'),
+    ('score', '<f4'),
+])
+
+
+class Template:
+    def __init__(self, name: str, image: cv2.Mat, levels: int, min_template_size: int = 8):
+        """
+        A template with its matching data computed up front.
+        :param name: The name results are reported under.
+        :param image: The template image, already in the color space it is matched in.
+        :param levels: The requested pyramid levels. Reduced if the template is too small for them.
+        :param min_template_size: The smallest width or height a pyramid level may have.
+        """
+        self.name = name
+        self.image = np.ascontiguousarray(image)
+        self.h, self.w = image.shape[:2]
+        self.levels = pyramid_levels(image, levels, min_template_size)
+        factor = 2 ** self.levels
+        self.small = cv2.resize(self.image, (max(self.w // factor, 1), max(self.h // factor, 1)),
+                                interpolation=cv2.INTER_AREA) if self.levels else None
+
+
+class TemplateLibrary:
+    def __init__(self, grayscale: bool = True, levels: int = 0, method=cv2.TM_CCOEFF_NORMED, workers: int = None):
+        """
+        Loads templates once and matches the whole set against a frame in one call.
+        :param grayscale: Matches in grayscale, which is about three times faster than in color.
+        :param levels: Pyramid levels for coarse-to-fine matching of each template. 0 matches at full resolution.
+        :param method: The matching method to use (default is cv2.TM_CCOEFF_NORMED).
+        :param workers: The number of threads matching templates in parallel. OpenCV releases the GIL while
+        matching, so this scales with cores. None or 1 matches on the calling thread.
+        """
+        self.grayscale = grayscale
+        self.levels = levels
+        self.method = method
+        self.templates: Dict[str, Template] = {}
+        self.executor = ThreadPoolExecutor(workers) if workers and workers > 1 else None
+
+    def add(self, name: str, image: cv2.Mat) -> Template:
+        """
+        Adds a template, replacing any template with the same name.
+        :param name: The name results are reported under.
+        :param image: The template image, in BGR or grayscale.
+        :return: The preprocessed template.
+        """
+        if self.grayscale and image.ndim == 3:
+            image = convert_to_gray(image)
+        template = Template(name, image, self.levels)
+        self.templates[name] = template
+        return template
+
+    def load(self, name: str, path: Union[str, Path]) -> Template:
+        """
+        Loads a template from an image file.
+        :param name: The name results are reported under.
+        :param path: The path to the image file.
+        :return: The preprocessed template.
+        """
+        flags = cv2.IMREAD_GRAYSCALE if self.grayscale else cv2.IMREAD_COLOR
+        image = load_mat_from_file(Path(path), flags)
+        if image is None:
+            raise ValueError(f"Could not read template {path}.")
+        return self.add(name, image)
+
+    def load_directory(self, directory: Union[str, Path], pattern: str = "*.png") -> List[Template]:
+        """
+        Loads every image of a directory as a template named after its file name without extension.
+        :param directory: The directory containing the templates.
+        :param pattern: A glob pattern selecting the images.
+        :return: The preprocessed templates.
+        """
+        return [self.load(path.stem, path) for path in sorted(Path(directory).glob(pattern))]
+
+    def remove(self, name: str):
+        """
+        Removes a template.
+        :param name: The name of the template.
+        """
+        self.templates.pop(name, None)
+
+    def __len__(self):
+        return len(self.templates)
+
+    def __contains__(self, name: str):
+        return name in self.templates
+
+    def match(self, image: cv2.Mat, threshold: float = None, names: Iterable[str] = None) -> np.ndarray:
+        """
+        Finds the best match of every template in an image.
+        :param image: The image to search. Its gray conversion and downscales are computed once for all templates.
+        :param threshold: An optional score a match needs to be reported. For TM_SQDIFF methods, the highest score.
+        :param names: Optional names of the templates to match. Defaults to every template.
+        :return: A structured array of MATCH_DTYPE with one row per reported template.
+        """
+        source = self.__prepare(image)
+        templates = self.__select(names)
+
+        def match_one(template: Template):
+            location, score = find_template_pyramid(source, template.image, self.method, template.levels,
+                                                    small_template=template.small)
+            return [(template.name, location[0], location[1], template.w, template.h, score)]
+
+        matches = self.__run(match_one, templates, source)
+        if threshold is not None and len(matches):
+            matches = matches[self.__passes(matches['score'], threshold)]
+        return matches
+
+    def match_all(self, image: cv2.Mat, threshold: float = 0.8, overlap: float = 0.3,
+                  names: Iterable[str] = None) -> np.ndarray:
+        """
+        Finds every occurrence of every template in an image.
+        :param image: The image to search. Its gray conversion is computed once for all templates.
+        :param threshold: The score a match needs. For TM_SQDIFF methods, the highest score a match may have.
+        :param overlap: The highest intersection-over-union two matches of the same template may have.
+        :param names: Optional names of the templates to match. Defaults to every template.
+        :return: A structured array of MATCH_DTYPE with one row per match.
+        """
+        source = self.__prepare(image)
+        templates = self.__select(names)
+
+        def match_one(template: Template):
+            boxes, scores = find_all_templates(source, template.image, threshold, self.method, overlap)
+            return [(template.name, x, y, w, h, score) for (x, y, w, h), score in zip(boxes.tolist(), scores.tolist())]
+
+        return self.__run(match_one, templates, source)
+
+    def close(self):
+        """
+        Shuts down the worker threads.
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __prepare(self, image: cv2.Mat) -> Frame:
+        if self.grayscale and image.ndim == 3:
+            image = convert_to_gray(image)
+        # A Frame caches the downscales shared by every template's pyramid search
+        return Frame(image)
+
+    def __select(self, names: Iterable[str] = None) -> List[Template]:
+        if names is None:
+            return list(self.templates.values())
+        return [self.templates[name] for name in names]
+
+    def __run(self, match_one, templates: List[Template], source: Frame) -> np.ndarray:
+        if self.executor is not None:
+            # Fill the shared downscales first so the workers don't all compute them at once
+            for levels in {template.levels for template in templates if template.levels}:
+                source.downscaled(2 ** levels)
+            rows = self.executor.map(match_one, templates)
+        else:
+            rows = map(match_one, templates)
+        return np.array([row for result in rows for row in result], dtype=MATCH_DTYPE)
+
+    def __passes(self, scores: np.ndarray, threshold: float) -> np.ndarray:
+        if self.method in [cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED]:
+            return scores <= threshold
+        return scores >= threshold
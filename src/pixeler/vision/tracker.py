@@ -0,0 +1,95 @@
+"""
+Template matching that follows a sprite from frame to frame instead of searching the whole image every time.
+"""
+import hashlib
+from typing import Dict, Hashable, Sequence
+
+import cv2
+import numpy as np
+
+from src.pixeler.vision.oir import find_template_pyramid
+
+
+class TemplateTracker:
+    def __init__(self, margin: int = 32, threshold: float = 0.8, method=cv2.TM_CCOEFF_NORMED, levels: int = 0):
+        """
+        Remembers where each template was last found and searches a small window around it first.
+        A full search only happens for new templates, or when the local match scores below the threshold.
+        :param margin: How far in pixels a template may move between two frames and still be found locally.
+        :param threshold: The score a match needs. For TM_SQDIFF methods, the highest score a match may have.
+        :param method: The matching method to use (default is cv2.TM_CCOEFF_NORMED).
+        :param levels: Pyramid levels used for the full search fallback. 0 searches at full resolution.
+        """
+        self.margin = margin
+        self.threshold = threshold
+        self.method = method
+        self.levels = levels
+        self.locations: Dict[Hashable, Sequence[int]] = {}
+        self.local_searches = 0
+        self.full_searches = 0
+
+    def find(self, image: cv2.Mat, template: cv2.Mat, key: Hashable = None) -> (Sequence[int], float):
+        """
+        Finds a template, searching around its previous location first.
+        :param image: The larger image in which to search (as a cv2 Mat).
+        :param template: The template image to search for (as a cv2 Mat).
+        :param key: The name the template is tracked under. Defaults to key(template), so a template reloaded
+        every frame is still tracked.
+        :return: The top-left corner (x, y) of the best match location and its score. If the score fails the
+        threshold, the template is no longer tracked and the next call searches the whole image.
+        """
+        key = self.key(template) if key is None else key
+        previous = self.locations.get(key)
+        if previous is not None:
+            location, score = self.__search_around(image, template, previous)
+            if location is not None and self.__passes(score):
+                self.locations[key] = location
+                return location, score
+
+        self.full_searches += 1
+        location, score = find_template_pyramid(image, template, self.method, self.levels)
+        if self.__passes(score):
+            self.locations[key] = location
+        else:
+            self.locations.pop(key, None)
+        return location, score
+
+    @staticmethod
+    def key(template: cv2.Mat) -> bytes:
+        """
+        Computes the key a template is tracked under when find() is given none.
+        :param template: The template image.
+        :return: A 16-byte digest of the template's shape and pixels, equal for equal templates.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{template.shape}\0{template.dtype}".encode())
+        digest.update(np.ascontiguousarray(template).data)
+        return digest.digest()
+
+    def forget(self, key: Hashable = None):
+        """
+        Stops tracking a template so its next search covers the whole image.
+        :param key: The name the template is tracked under, or key(template) for templates found without a name.
+        Forgets every template if omitted.
+        """
+        if key is None:
+            self.locations.clear()
+        else:
+            self.locations.pop(key, None)
+
+    def __search_around(self, image: cv2.Mat, template: cv2.Mat, previous: Sequence[int]):
+        th, tw = template.shape[:2]
+        x0 = max(previous[0] - self.margin, 0)
+        y0 = max(previous[1] - self.margin, 0)
+        x1 = min(previous[0] + self.margin + tw, image.shape[1])
+        y1 = min(previous[1] + self.margin + th, image.shape[0])
+        if x1 - x0 < tw or y1 - y0 < th:
+            return None, None
+        self.local_searches += 1
+        (x, y), score = find_template_pyramid(image[y0:y1, x0:x1], template, self.method, levels=0)
+        return (x0 + x, y0 + y), score
+
+    def __passes(self, score: float) -> bool:
+        if self.method in [cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED]:
+            return score <= self.threshold
+        return score >= self.threshold
@@ -6,6 +6,7 @@ import numpy as np
 from mss.screenshot import ScreenShot
 
 from src.pixeler.vision.color import Color
+from src.pixeler.vision.frame import Frame
 
 
 def load_mat_from_file(path: Path, flags: int = cv2.IMREAD_GRAYSCALE) -> cv2.Mat:
@@ -18,13 +19,24 @@ def load_mat_from_file(path: Path, flags: int = cv2.IMREAD_GRAYSCALE) -> cv2.Mat
     return cv2.imread(str(path), flags)
 
 
-def mss_to_cv2(screenshot: ScreenShot) -> cv2.Mat:
+def mss_to_cv2(screenshot: ScreenShot, out: cv2.Mat = None) -> Frame:
     """
     Converts a mss screenshot to a cv Mat.
     :param screenshot: The screenshot to convert.
-    :return: A cv Mat
+    :param out: An optional BGR buffer to convert into. It is reused when its shape matches the screenshot.
+    :return: A Frame, which is a cv Mat caching its color-space conversions
+    """
+    return Frame(cv2.cvtColor(bgra_view(screenshot), cv2.COLOR_BGRA2BGR, dst=out))
+
+
+def bgra_view(screenshot: ScreenShot) -> cv2.Mat:
+    """
+    Returns a BGRA Mat sharing memory with the grabbed bytes of a mss screenshot, without copying.
+    The view is only valid as long as the screenshot is.
+    :param screenshot: The screenshot to view.
+    :return: A BGRA cv Mat
     """
-    return cv2.cvtColor(np.array(screenshot), cv2.COLOR_BGRA2BGR)
+    return np.asarray(screenshot)
 
 
 def edge_detect(mat: cv2.Mat, threshold1: int = 200, threshold2: int = 300) -> cv2.Mat:
@@ -40,11 +52,13 @@ def edge_detect(mat: cv2.Mat, threshold1: int = 200, threshold2: int = 300) -> c
 
 def convert(mat: cv2.Mat, code: int) -> cv2.Mat:
     """
-    Convert Mat from one color-space type to another
+    Convert Mat from one color-space type to another. Frames convert once and return the cached result after.
     :param mat: The cv Mat
     :param code: The color space (cv2.COLOR_XXX)
-    :return: A new Mat
+    :return: A new Mat, or the cached conversion of a Frame
     """
+    if isinstance(mat, Frame):
+        return mat.convert(code)
     return cv2.cvtColor(mat, code)
 
 
@@ -57,6 +71,24 @@ def convert_to_gray(img: cv2.Mat) -> cv2.Mat:
     return convert(img, cv2.COLOR_BGR2GRAY)
 
 
+def perceptual_hash(mat: cv2.Mat, hash_size: int = 8, highfreq_factor: int = 4) -> int:
+    """
+    Computes a DCT perceptual hash. Similar images get hashes differing in few bits, even after scaling,
+    compression or small changes, so the Hamming distance of two hashes measures how alike the images are.
+    :param mat: The BGR or grayscale image. A Frame reuses its cached gray conversion.
+    :param hash_size: The hash has hash_size * hash_size bits.
+    :param highfreq_factor: How much larger than the hash the image is shrunk to before the DCT.
+    :return: The hash as an int
+    """
+    gray = convert_to_gray(mat) if mat.ndim == 3 else mat
+    size = hash_size * highfreq_factor
+    small = cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:hash_size, :hash_size].ravel()
+    # The DC term only carries the overall brightness, leave it out of the median
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
 def mask_to_color(mat: cv2.Mat, color: Color) -> cv2.Mat:
     """
     Thresholds the image to get only a given color
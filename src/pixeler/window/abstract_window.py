@@ -1,9 +1,17 @@
 from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence
 
 import cv2
 
+from src.pixeler.math.rectangle import Rectangle
+from src.pixeler.vision.frame import Frame
+from src.pixeler.window.capture import CaptureThread, CapturedFrame, FrameRing
+
 
 class AbstractWindow(ABC):
+    # A class attribute, so subclasses work without calling this class's __init__
+    capture_thread: Optional[CaptureThread] = None
+
     @abstractmethod
     def focus(self):
         """
@@ -65,6 +73,16 @@ class AbstractWindow(ABC):
         """
         pass
 
+    def bounds(self) -> Rectangle:
+        """
+        Returns the screen-space position and size of the window as one consistent snapshot.
+        Windows that can read their geometry in one call should override this, the default combines
+        position(), width() and height().
+        :return: A Rectangle of the window on the screen.
+        """
+        x, y = self.position()[:2]
+        return Rectangle(x, y, self.width(), self.height())
+
     @abstractmethod
     def resize(self, width: int, height: int):
         """
@@ -75,9 +93,80 @@ class AbstractWindow(ABC):
         pass
 
     @abstractmethod
-    def screenshot(self) -> cv2.Mat:
+    def screenshot(self, region: Rectangle = None, out: cv2.Mat = None) -> Frame:
         """
         Takes a screenshot of the window and returns it.
-        :return: A Mat of the window.
+        :param region: An optional Rectangle relative to the window's top-left corner. Only this area is grabbed.
+        :param out: An optional BGR buffer to write the screenshot into. It is reused when its shape matches the
+        window, otherwise a new Mat is returned.
+        :return: A Frame of the window, which is a Mat caching its color-space conversions.
         """
         pass
+
+    def screenshot_regions(self, regions: Sequence[Rectangle], outs: Sequence[cv2.Mat] = None) -> List[cv2.Mat]:
+        """
+        Takes a screenshot of each given region of the window, grabbing only those areas.
+        :param regions: Rectangles relative to the window's top-left corner.
+        :param outs: Optional BGR buffers to write each screenshot into, in the same order as the regions.
+        :return: A Mat per region.
+        """
+        if outs is None:
+            outs = [None] * len(regions)
+        return [self.screenshot(region=region, out=out) for region, out in zip(regions, outs)]
+
+    def start_capture(self, buffers: int = 3, interval: float = 0.0, region: Rectangle = None):
+        """
+        Starts capturing screenshots of the window on a background thread.
+        The newest frame can then be read with latest_frame() without waiting for a grab.
+        :param buffers: The number of frame buffers to rotate through.
+        :param interval: The minimum time between two captures in seconds. 0 captures as fast as possible.
+        :param region: An optional Rectangle relative to the window to capture instead of the whole window.
+        """
+        if self.capture_thread is not None:
+            return
+        self.capture_thread = CaptureThread(self, FrameRing(buffers), interval, region)
+        self.capture_thread.start()
+
+    def stop_capture(self):
+        """
+        Stops the background capture thread if it is running.
+        """
+        if self.capture_thread is None:
+            return
+        self.capture_thread.stop()
+        self.capture_thread.join()
+        self.capture_thread = None
+
+    def is_capturing(self) -> bool:
+        """
+        Returns whether the background capture thread is running.
+        :return: True if frames are being captured in the background. False once the source has ended.
+        """
+        return self.capture_thread is not None and self.capture_thread.is_alive()
+
+    def latest_frame(self, copy: bool = False) -> Optional[CapturedFrame]:
+        """
+        Returns the newest frame from the background capture thread without blocking.
+        The image is a ring buffer that is reused after the ring wraps around, use copy=True to keep it longer.
+        :param copy: Returns a copy of the image instead of the ring buffer itself.
+        :return: The newest frame with its sequence number and timestamp, or None if nothing was captured yet.
+        """
+        if self.capture_thread is None:
+            raise RuntimeError("Capture is not running. Call start_capture() first.")
+        if self.capture_thread.error is not None:
+            raise self.capture_thread.error
+        return self.capture_thread.ring.latest(copy)
+
+    def wait_frame(self, after: int = -1, timeout: float = None) -> Optional[CapturedFrame]:
+        """
+        Blocks until the background capture thread publishes a frame newer than the given sequence number.
+        :param after: The last sequence number the caller has processed.
+        :param timeout: The maximum time to wait in seconds.
+        :return: The newest frame, or None if the timeout expired or the capture ended without a newer frame.
+        """
+        if self.capture_thread is None:
+            raise RuntimeError("Capture is not running. Call start_capture() first.")
+        frame = self.capture_thread.ring.wait(after, timeout)
+        if self.capture_thread.error is not None:
+            raise self.capture_thread.error
+        return frame
@@ -0,0 +1,166 @@
+"""
+Background capture of window screenshots into a ring of reusable frame buffers.
+"""
+
+import threading
+import time
+from typing import NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+
+def capture_box(left: int, top: int, width: int, height: int, region=None) -> dict:
+    """
+    Builds a mss capture box for a window, optionally restricted to a window-relative region.
+    :param left: The screen x position of the window.
+    :param top: The screen y position of the window.
+    :param width: The width of the window.
+    :param height: The height of the window.
+    :param region: An optional Rectangle relative to the window's top-left corner. It is clipped to the window.
+    :return: A mss capture box.
+    """
+    if region is None:
+        return {'top': top, 'left': left, 'width': width, 'height': height}
+    x = max(region.x, 0)
+    y = max(region.y, 0)
+    w = min(region.x + region.w, width) - x
+    h = min(region.y + region.h, height) - y
+    if w <= 0 or h <= 0:
+        raise ValueError(f"{region} does not overlap the window.")
+    return {'top': top + y, 'left': left + x, 'width': w, 'height': h}
+
+
+class CapturedFrame(NamedTuple):
+    image: cv2.Mat
+    sequence: int
+    timestamp: float
+
+
+class FrameRing:
+    def __init__(self, size: int = 3):
+        """
+        A fixed number of frame buffers that are written in turn by a single producer.
+        A published frame stays untouched until the producer has wrapped around the ring,
+        so readers get `size - 1` frame periods to use it before it is overwritten.
+        :param size: The number of buffers in the ring. Must be at least 2.
+        """
+        if size < 2:
+            raise ValueError("A frame ring needs at least 2 buffers.")
+        self.size = size
+        self.buffers = [None] * size
+        self.timestamps = [0.0] * size
+        self.sequence = -1
+        self.closed = False
+        self.condition = threading.Condition()
+
+    def next_buffer(self) -> Optional[cv2.Mat]:
+        """
+        Returns the buffer that the next frame will be written into, for use as a screenshot out= target.
+        :return: The buffer, or None if it has not been allocated yet.
+        """
+        return self.buffers[(self.sequence + 1) % self.size]
+
+    def commit(self, image: cv2.Mat, timestamp: float = None):
+        """
+        Publishes an image written into next_buffer() as the latest frame.
+        If the image is not that buffer (e.g. the window was resized), it takes its place in the ring.
+        :param image: The image to publish.
+        :param timestamp: The capture time of the image. Defaults to now.
+        """
+        index = (self.sequence + 1) % self.size
+        self.buffers[index] = image
+        with self.condition:
+            self.timestamps[index] = time.time() if timestamp is None else timestamp
+            self.sequence += 1
+            self.condition.notify_all()
+
+    def write(self, image: cv2.Mat, timestamp: float = None):
+        """
+        Copies an image into the next buffer of the ring and publishes it as the latest frame.
+        The buffer is only reallocated when the image shape or type changes.
+        :param image: The image to publish.
+        :param timestamp: The capture time of the image. Defaults to now.
+        """
+        buffer = self.next_buffer()
+        if buffer is None or buffer.shape != image.shape or buffer.dtype != image.dtype:
+            buffer = np.empty_like(image)
+        np.copyto(buffer, image)
+        self.commit(buffer, timestamp)
+
+    def latest(self, copy: bool = False) -> Optional[CapturedFrame]:
+        """
+        Returns the most recently published frame without waiting.
+        :param copy: Returns a copy of the image instead of the ring buffer itself.
+        :return: The latest frame, or None if nothing was captured yet.
+        """
+        with self.condition:
+            if self.sequence < 0:
+                return None
+            index = self.sequence % self.size
+            frame = CapturedFrame(self.buffers[index], self.sequence, self.timestamps[index])
+        if copy:
+            return frame._replace(image=frame.image.copy())
+        return frame
+
+    def wait(self, after: int = -1, timeout: float = None) -> Optional[CapturedFrame]:
+        """
+        Blocks until a frame newer than the given sequence number is published.
+        :param after: The last sequence number the caller has seen.
+        :param timeout: The maximum time to wait in seconds.
+        :return: The latest frame, or None if the timeout expired.
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.sequence > after or self.closed, timeout):
+                return None
+            if self.sequence <= after:
+                return None
+        return self.latest()
+
+    def close(self):
+        """
+        Wakes up every waiting reader once the producer has stopped.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class CaptureThread(threading.Thread):
+    def __init__(self, window, ring: FrameRing, interval: float = 0.0, region=None):
+        """
+        Continuously screenshots a window into a frame ring.
+        The thread stops and closes the ring when a screenshot returns None, so waiting readers wake up.
+        :param window: The AbstractWindow to capture.
+        :param ring: The ring receiving the frames.
+        :param interval: The minimum time between two captures in seconds. 0 captures as fast as possible.
+        :param region: An optional Rectangle relative to the window to capture instead of the whole window.
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.window = window
+        self.ring = ring
+        self.interval = interval
+        self.region = region
+        self.error = None
+        self.__stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.__stopped.is_set():
+                started = time.time()
+                image = self.window.screenshot(region=self.region, out=self.ring.next_buffer())
+                if image is None:
+                    # The source has ended (e.g. a replay) or the window is gone, there is nothing left to wait for
+                    break
+                self.ring.commit(image, started)
+                remaining = self.interval - (time.time() - started)
+                if remaining > 0:
+                    self.__stopped.wait(remaining)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.ring.close()
+
+    def stop(self):
+        """Signals the thread to finish its current capture and exit. This can be followed by join()."""
+        self.__stopped.set()
@@ -0,0 +1,241 @@
+"""
+Shares screenshots with other processes through a ring of frames in shared memory.
+"""
+import os
+import time
+from multiprocessing import shared_memory
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from src.pixeler.math.rectangle import Rectangle
+from src.pixeler.window.abstract_window import AbstractWindow
+from src.pixeler.window.capture import CapturedFrame
+
+# Header layout: [slots, height, width, channels, latest sequence], then a sequence and timestamp per slot
+HEADER_FIELDS = 5
+SLOTS, HEIGHT, WIDTH, CHANNELS, LATEST = range(HEADER_FIELDS)
+# A slot whose sequence is WRITING is being overwritten and must not be read
+WRITING = -2
+ALIGNMENT = 64
+
+
+def _layout(slots: int) -> (int, int):
+    """
+    Returns the byte offsets of the slot timestamps and of the first frame.
+    """
+    times = (HEADER_FIELDS + slots) * 8
+    frames = times + slots * 8
+    return times, -(-frames // ALIGNMENT) * ALIGNMENT
+
+
+class _FrameRing:
+    def __init__(self, shm: shared_memory.SharedMemory, slots: int, height: int, width: int, channels: int):
+        times, frames = _layout(slots)
+        self.shm = shm
+        self.header = np.ndarray((HEADER_FIELDS + slots,), dtype=np.int64, buffer=shm.buf)
+        self.sequences = self.header[HEADER_FIELDS:]
+        self.timestamps = np.ndarray((slots,), dtype=np.float64, buffer=shm.buf, offset=times)
+        self.frames = np.ndarray((slots, height, width, channels), dtype=np.uint8, buffer=shm.buf, offset=frames)
+        self.slots = slots
+
+    def frame(self, sequence: int, copy: bool) -> Optional[CapturedFrame]:
+        index = sequence % self.slots
+        if sequence < 0 or self.sequences[index] != sequence:
+            return None
+        image = self.frames[index]
+        timestamp = float(self.timestamps[index])
+        if copy:
+            image = image.copy()
+            # The writer may have wrapped around while copying
+            if self.sequences[index] != sequence:
+                return None
+        return CapturedFrame(image, sequence, timestamp)
+
+    def release(self):
+        # Drop the numpy views first, the shared memory cannot be closed while they exist
+        self.header = self.sequences = self.timestamps = self.frames = None
+        self.shm.close()
+
+
+class FramePublisher:
+    def __init__(self, name: str, width: int, height: int, channels: int = 3, slots: int = 4):
+        """
+        Creates a named shared memory ring that FrameSubscribers in other processes can attach to.
+        :param name: The shared memory name subscribers attach with.
+        :param width: The width of every published frame.
+        :param height: The height of every published frame.
+        :param channels: The channels of every published frame.
+        :param slots: The number of frames kept in the ring. Readers have slots - 1 frames to use a frame.
+        """
+        if slots < 2:
+            raise ValueError("A frame ring needs at least 2 slots.")
+        size = _layout(slots)[1] + slots * height * width * channels
+        self.ring = _FrameRing(shared_memory.SharedMemory(name, create=True, size=size), slots, height, width,
+                               channels)
+        self.ring.header[:HEADER_FIELDS] = (slots, height, width, channels, -1)
+        self.ring.sequences[:] = -1
+        self.name = self.ring.shm.name
+        self.shape = (height, width, channels)
+        self.sequence = -1
+
+    @classmethod
+    def from_window(cls, name: str, window: AbstractWindow, region: Rectangle = None,
+                    slots: int = 4) -> 'FramePublisher':
+        """
+        Creates a publisher sized for a window's current screenshot.
+        :param name: The shared memory name subscribers attach with.
+        :param window: The window that will be published.
+        :param region: An optional Rectangle relative to the window that will be published instead.
+        :param slots: The number of frames kept in the ring.
+        :return: A new FramePublisher.
+        """
+        bounds = window.bounds() if region is None else region
+        return cls(name, bounds.w, bounds.h, 3, slots)
+
+    def next_buffer(self) -> cv2.Mat:
+        """
+        Marks the next slot as being written and returns it, for use as a screenshot out= target.
+        Call commit() once the frame is written.
+        :return: The shared memory frame buffer.
+        """
+        index = (self.sequence + 1) % self.ring.slots
+        self.ring.sequences[index] = WRITING
+        return self.ring.frames[index]
+
+    def commit(self, timestamp: float = None) -> int:
+        """
+        Publishes the frame written into next_buffer() to subscribers.
+        :param timestamp: The capture time of the frame. Defaults to now.
+        :return: The sequence number of the frame.
+        """
+        self.sequence += 1
+        index = self.sequence % self.ring.slots
+        self.ring.timestamps[index] = time.time() if timestamp is None else timestamp
+        self.ring.sequences[index] = self.sequence
+        self.ring.header[LATEST] = self.sequence
+        return self.sequence
+
+    def publish(self, image: cv2.Mat, timestamp: float = None) -> int:
+        """
+        Copies an image into the ring and publishes it.
+        :param image: The image to publish. Its shape must match the ring.
+        :param timestamp: The capture time of the image. Defaults to now.
+        :return: The sequence number of the frame.
+        """
+        if image.shape != self.shape:
+            raise ValueError(f"Expected a frame of shape {self.shape}, got {image.shape}.")
+        np.copyto(self.next_buffer(), image)
+        return self.commit(timestamp)
+
+    def publish_window(self, window: AbstractWindow, region: Rectangle = None) -> Optional[int]:
+        """
+        Screenshots a window straight into the ring and publishes it, without intermediate copies.
+        When nothing is published, the frame previously in the slot stays readable.
+        :param window: The window to capture.
+        :param region: An optional Rectangle relative to the window to capture instead.
+        :return: The sequence number of the frame, or None if the window returned no screenshot,
+        e.g. because it has no handle or its source has ended.
+        """
+        started = time.time()
+        index = (self.sequence + 1) % self.ring.slots
+        previous = int(self.ring.sequences[index])
+        buffer = self.next_buffer()
+        try:
+            image = window.screenshot(region=region, out=buffer)
+            if image is not None and not np.may_share_memory(image, buffer):
+                raise ValueError(f"Expected a frame of shape {self.shape}, got {image.shape}. "
+                                 f"Was the window resized?")
+        except BaseException:
+            self.ring.sequences[index] = previous
+            raise
+        if image is None:
+            self.ring.sequences[index] = previous
+            return None
+        return self.commit(started)
+
+    def close(self):
+        """
+        Closes and removes the shared memory. Attached subscribers keep their mapping until they close.
+        """
+        shm = self.ring.shm
+        self.ring.release()
+        if os.name == "posix":
+            # A subscriber in a process sharing our resource tracker may have unregistered the memory
+            from multiprocessing import resource_tracker
+            resource_tracker.register(shm._name, "shared_memory")
+        shm.unlink()
+
+
+class FrameSubscriber:
+    def __init__(self, name: str):
+        """
+        Attaches to a FramePublisher's ring from any process. Frames are read as NumPy views into shared memory.
+        :param name: The shared memory name of the publisher.
+        """
+        shm = shared_memory.SharedMemory(name)
+        if os.name == "posix":
+            # Only the creating publisher may unlink the memory, stop the resource tracker from doing it on exit
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        slots, height, width, channels = np.ndarray((4,), dtype=np.int64, buffer=shm.buf).tolist()
+        self.ring = _FrameRing(shm, slots, height, width, channels)
+        self.shape = (height, width, channels)
+
+    def latest_sequence(self) -> int:
+        """
+        Returns the sequence number of the newest published frame.
+        :return: The sequence number, or -1 if nothing was published yet.
+        """
+        return int(self.ring.header[LATEST])
+
+    def latest(self, copy: bool = False) -> Optional[CapturedFrame]:
+        """
+        Returns the newest published frame without waiting.
+        Without copy, the image is a view into shared memory that is overwritten once the ring wraps around;
+        use valid() after processing it to check it was not.
+        :param copy: Returns a private copy of the image.
+        :return: The newest frame, or None if nothing is readable yet.
+        """
+        return self.ring.frame(self.latest_sequence(), copy)
+
+    def read(self, sequence: int, copy: bool = False) -> Optional[CapturedFrame]:
+        """
+        Returns a specific frame if it is still in the ring.
+        :param sequence: The sequence number of the frame.
+        :param copy: Returns a private copy of the image.
+        :return: The frame, or None if it was overwritten or not published yet.
+        """
+        return self.ring.frame(sequence, copy)
+
+    def wait(self, after: int = -1, timeout: float = None, poll: float = 0.001) -> Optional[CapturedFrame]:
+        """
+        Polls until a frame newer than the given sequence number is published.
+        :param after: The last sequence number the caller has processed.
+        :param timeout: The maximum time to wait in seconds.
+        :param poll: The time between two checks in seconds.
+        :return: The newest frame, or None if the timeout expired.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            frame = self.latest() if self.latest_sequence() > after else None
+            if frame is not None:
+                return frame
+            if deadline is not None and time.time() >= deadline:
+                return None
+            time.sleep(poll)
+
+    def valid(self, frame: CapturedFrame) -> bool:
+        """
+        Returns whether a frame's shared memory slot still holds that frame.
+        :param frame: A frame returned by this subscriber.
+        :return: False if the publisher has overwritten the frame since it was read.
+        """
+        return self.ring.sequences[frame.sequence % self.ring.slots] == frame.sequence
+
+    def close(self):
+        """
+        Detaches from the shared memory. Views returned without copy become invalid.
+        """
+        self.ring.release()
@@ -0,0 +1,58 @@
+"""
+Cached window geometry shared by every operation on a window.
+"""
+
+import threading
+import time
+from typing import Callable, Tuple
+
+from src.pixeler.math.rectangle import Rectangle
+
+
+class GeometryTracker:
+    def __init__(self, fetch: Callable[[], Tuple[int, int, int, int]], interval: float = 0.0):
+        """
+        Reads the position and size of a window from the OS in one call, optionally caching them.
+        A snapshot always holds one consistent read, so a frame can never mix the position from before a move
+        with the size from after it. By default every read refreshes it, since the user or the OS can move the
+        window at any time and only this window's own moves invalidate the cache.
+        :param fetch: Returns the current (left, top, width, height) of the window from the OS.
+        :param interval: Seconds a snapshot stays valid. 0 refreshes on every read, None only when invalidated.
+        A longer interval saves OS calls but screenshots may cover the old area of a window moved externally.
+        """
+        self.fetch = fetch
+        self.interval = interval
+        self.snapshot: Rectangle = None
+        self.updated = 0.0
+        self.lock = threading.Lock()
+
+    def bounds(self) -> Rectangle:
+        """
+        Returns the screen-space bounds of the window, refreshing them if the snapshot is stale.
+        :return: The window bounds. Treat it as read-only, it is shared by every caller.
+        """
+        with self.lock:
+            if self.snapshot is None or (self.interval is not None and time.time() - self.updated >= self.interval):
+                self.__refresh()
+            return self.snapshot
+
+    def refresh(self) -> Rectangle:
+        """
+        Fetches the window bounds from the OS immediately.
+        :return: The new window bounds.
+        """
+        with self.lock:
+            self.__refresh()
+            return self.snapshot
+
+    def invalidate(self):
+        """
+        Marks the snapshot as stale, e.g. after moving or resizing the window, so the next read refreshes it.
+        """
+        with self.lock:
+            self.snapshot = None
+
+    def __refresh(self):
+        left, top, width, height = self.fetch()
+        self.snapshot = Rectangle(left, top, width, height)
+        self.updated = time.time()
@@ -0,0 +1,184 @@
+"""
+Records screenshots to a compact append-only file and reads them back memory-mapped.
+
+A recording is two files: the frame data at `path`, and a fixed-size record per frame at `path.idx`
+holding its offset, length, timestamp and shape. Frames are zlib-compressed, and every frame between
+two keyframes is stored as its difference to the previous frame, which is mostly zeros on static screens.
+"""
+import mmap
+import queue
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Union
+
+import cv2
+import numpy as np
+
+MAGIC = b"PXLREC01"
+INDEX_DTYPE = np.dtype([
+    ('offset', '<u8'),
+    ('length', '<u4'),
+    ('timestamp', '<f8'),
+    ('width', '<u4'),
+    ('height', '<u4'),
+    ('channels', '<u1'),
+    ('keyframe', '<u1'),
+])
+
+
+def index_path(path: Union[str, Path]) -> Path:
+    """
+    Returns the path of the index file belonging to a recording.
+    :param path: The path of the recording.
+    :return: The index file path.
+    """
+    path = Path(path)
+    return path.with_name(path.name + ".idx")
+
+
+class FrameRecorder:
+    def __init__(self, path: Union[str, Path], keyframe_interval: int = 60, compression: int = 1,
+                 queue_size: int = 16):
+        """
+        Streams frames to a recording file on a background thread.
+        :param path: The path of the recording. It is overwritten if it exists.
+        :param keyframe_interval: The number of frames between two full frames. Seeking decodes at most this many.
+        :param compression: The zlib compression level, from 1 (fastest) to 9 (smallest).
+        :param queue_size: The number of frames that can wait for encoding before write() blocks.
+        """
+        self.path = Path(path)
+        self.keyframe_interval = keyframe_interval
+        self.compression = compression
+        self.data = open(self.path, "wb")
+        self.data.write(MAGIC)
+        self.index = open(index_path(self.path), "wb")
+        self.queue = queue.Queue(queue_size)
+        self.error = None
+        self.frames = 0
+        self.thread = threading.Thread(target=self.__run, daemon=True)
+        self.thread.start()
+
+    def write(self, image: cv2.Mat, timestamp: float = None):
+        """
+        Queues a copy of a frame for recording. Blocks while the encoder is behind by queue_size frames.
+        :param image: The frame to record.
+        :param timestamp: The capture time of the frame. Defaults to now.
+        """
+        if self.error is not None:
+            raise self.error
+        self.queue.put((image.copy(), time.time() if timestamp is None else timestamp))
+
+    def close(self):
+        """
+        Encodes every queued frame and closes the recording.
+        """
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self.data.close()
+        self.index.close()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __run(self):
+        previous = None
+        delta = None
+        record = np.zeros(1, dtype=INDEX_DTYPE)
+        try:
+            while True:
+                item = self.queue.get()
+                if item is None:
+                    return
+                image, timestamp = item
+                image = image if image.ndim == 3 else image[:, :, np.newaxis]
+                keyframe = (previous is None or previous.shape != image.shape
+                            or self.frames % self.keyframe_interval == 0)
+                if keyframe:
+                    payload = zlib.compress(image, self.compression)
+                    delta = np.empty_like(image)
+                else:
+                    # uint8 subtraction wraps around, so adding the delta back restores the frame exactly
+                    np.subtract(image, previous, out=delta)
+                    payload = zlib.compress(delta, self.compression)
+                record[0] = (self.data.tell(), len(payload), timestamp, image.shape[1], image.shape[0],
+                             image.shape[2], keyframe)
+                self.data.write(payload)
+                self.index.write(record.tobytes())
+                previous = image
+                self.frames += 1
+        except Exception as e:
+            self.error = e
+
+
+class FrameReader:
+    def __init__(self, path: Union[str, Path]):
+        """
+        Opens a recording memory-mapped for random access.
+        :param path: The path of the recording.
+        """
+        self.path = Path(path)
+        self.file = open(self.path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a frame recording.")
+        index = np.fromfile(index_path(self.path), dtype=INDEX_DTYPE)
+        # Ignore frames whose data did not make it to disk, e.g. after a crash
+        self.index = index[index['offset'] + index['length'] <= len(self.data)]
+        self.timestamps = self.index['timestamp']
+        positions = np.arange(len(self.index))
+        self.keyframes = np.maximum.accumulate(np.where(self.index['keyframe'] == 1, positions, 0))
+        self.frame: cv2.Mat = None
+        self.position = -1
+
+    def __len__(self):
+        return len(self.index)
+
+    def read(self, position: int) -> cv2.Mat:
+        """
+        Decodes a frame. Reading forward from the last frame only applies the deltas in between.
+        :param position: The frame number.
+        :return: The frame. The buffer is reused by the next read, copy it to keep it.
+        """
+        if not 0 <= position < len(self.index):
+            raise IndexError(f"Frame {position} is out of range for a recording of {len(self.index)} frames.")
+        start = self.keyframes[position]
+        if start <= self.position <= position:
+            start = self.position + 1
+        for current in range(start, position + 1):
+            self.__apply(current)
+        self.position = position
+        return self.frame if self.frame.shape[2] > 1 else self.frame[:, :, 0]
+
+    def seek(self, timestamp: float) -> int:
+        """
+        Returns the last frame recorded at or before a timestamp.
+        :param timestamp: The timestamp to look up.
+        :return: The frame number, or 0 if the timestamp is before the recording.
+        """
+        return max(int(np.searchsorted(self.timestamps, timestamp, side='right')) - 1, 0)
+
+    def close(self):
+        """
+        Unmaps and closes the recording.
+        """
+        self.data.close()
+        self.file.close()
+
+    def __apply(self, position: int):
+        offset, length, _, width, height, channels, keyframe = self.index[position].tolist()
+        decoded = np.frombuffer(zlib.decompress(self.data[offset:offset + length]), dtype=np.uint8)
+        decoded = decoded.reshape(height, width, channels)
+        if keyframe:
+            if self.frame is None or self.frame.shape != decoded.shape:
+                self.frame = np.empty_like(decoded)
+            np.copyto(self.frame, decoded)
+        else:
+            np.add(self.frame, decoded, out=self.frame)
@@ -0,0 +1,42 @@
+"""
+Class for replaying a recording made with a FrameRecorder as if it were a live window.
+"""
+from pathlib import Path
+from typing import Optional, Union
+
+import cv2
+
+from src.pixeler.window.recorder import FrameReader
+from src.pixeler.window.virtual_window import VirtualWindow
+
+
+class ReplayWindow(VirtualWindow):
+    def __init__(self, path: Union[str, Path], realtime: bool = True, loop: bool = False):
+        """
+        :param path: The path of the recording.
+        :param realtime: Replays at the recorded speed, waiting for the next frame when the caller is faster
+        and skipping frames when it is slower. Otherwise every screenshot() returns the next frame immediately.
+        :param loop: Starts over at the end of the recording instead of returning None.
+        """
+        self.reader = FrameReader(path)
+        width, height = (int(self.reader.index[0]['width']), int(self.reader.index[0]['height'])) \
+            if len(self.reader) else (0, 0)
+        super().__init__(width, height, realtime=realtime, loop=loop)
+
+    def frame_count(self) -> Optional[int]:
+        return len(self.reader)
+
+    def render(self, index: int) -> cv2.Mat:
+        frame = self.reader.read(index)
+        self.h, self.w = frame.shape[:2]
+        return frame
+
+    def timestamp(self, index: int) -> float:
+        return float(self.reader.timestamps[index] - self.reader.timestamps[0])
+
+    def seek(self, elapsed: float) -> int:
+        return self.reader.seek(self.reader.timestamps[0] + elapsed)
+
+    def close(self):
+        super().close()
+        self.reader.close()
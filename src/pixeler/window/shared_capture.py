@@ -0,0 +1,96 @@
+"""
+Captures several windows with a single screen grab per tick.
+"""
+from typing import Dict, List, Sequence
+
+import cv2
+from mss import mss
+
+from src.pixeler.math.rectangle import Rectangle
+from src.pixeler.vision.utils import mss_to_cv2
+from src.pixeler.window.abstract_window import AbstractWindow
+from src.pixeler.window.capture import capture_box
+
+
+class SharedCapture:
+    def __init__(self, windows: Sequence[AbstractWindow] = (), monitor: int = None):
+        """
+        Grabs the union of every registered window's bounds once per tick and hands each window a view of it.
+        The capture cost stays constant as more windows are added, as long as they sit close together.
+        :param windows: The windows to capture.
+        :param monitor: An optional mss monitor index to always grab whole, instead of the union of the windows.
+        """
+        self.windows: List[AbstractWindow] = list(windows)
+        self.monitor = monitor
+        self.mss = None
+        self.frame: cv2.Mat = None
+        self.origin = Rectangle(0, 0, 0, 0)
+        self.bounds: Dict[int, Rectangle] = {}
+
+    def register(self, window: AbstractWindow):
+        """
+        Adds a window to the shared capture. It gets a view from the next tick onwards.
+        :param window: The window to add.
+        """
+        if window not in self.windows:
+            self.windows.append(window)
+
+    def unregister(self, window: AbstractWindow):
+        """
+        Removes a window from the shared capture.
+        :param window: The window to remove.
+        """
+        if window in self.windows:
+            self.windows.remove(window)
+            self.bounds.pop(id(window), None)
+
+    def tick(self) -> List[cv2.Mat]:
+        """
+        Takes one screenshot covering every registered window.
+        The shared frame buffer is reused between ticks, so views from an earlier tick are overwritten.
+        :return: A view of each registered window in registration order.
+        """
+        if self.mss is None:
+            self.mss = mss()
+        self.bounds = {id(window): window.bounds() for window in self.windows}
+
+        if self.monitor is not None:
+            monitor = self.mss.monitors[self.monitor]
+            box = capture_box(monitor['left'], monitor['top'], monitor['width'], monitor['height'])
+        else:
+            if not self.bounds:
+                raise ValueError("No windows are registered.")
+            left = min(bounds.x for bounds in self.bounds.values())
+            top = min(bounds.y for bounds in self.bounds.values())
+            right = max(bounds.x + bounds.w for bounds in self.bounds.values())
+            bottom = max(bounds.y + bounds.h for bounds in self.bounds.values())
+            box = capture_box(left, top, right - left, bottom - top)
+
+        self.frame = mss_to_cv2(self.mss.grab(box), self.frame)
+        self.origin = Rectangle(box['left'], box['top'], box['width'], box['height'])
+        return [self.view(window) for window in self.windows]
+
+    def view(self, window: AbstractWindow, region: Rectangle = None) -> cv2.Mat:
+        """
+        Returns the part of the last tick's frame covered by a window, without copying.
+        :param window: A registered window.
+        :param region: An optional Rectangle relative to the window's top-left corner.
+        :return: A view of the shared frame, clipped to the grabbed area.
+        """
+        if self.frame is None:
+            raise RuntimeError("Nothing was captured yet. Call tick() first.")
+        bounds = self.bounds.get(id(window))
+        if bounds is None:
+            raise ValueError("The window was not registered when the last tick was taken.")
+        box = capture_box(bounds.x - self.origin.x, bounds.y - self.origin.y, bounds.w, bounds.h, region)
+        top, bottom = max(box['top'], 0), max(box['top'] + box['height'], 0)
+        left, right = max(box['left'], 0), max(box['left'] + box['width'], 0)
+        return self.frame[top:bottom, left:right]
+
+    def close(self):
+        """
+        Releases the mss instance.
+        """
+        if self.mss:
+            self.mss.close()
+            self.mss = None
@@ -0,0 +1,271 @@
+"""
+Windows backed by images, videos or generated scenes instead of the desktop.
+They run anywhere OpenCV does, so bots can be benchmarked and tested on machines without a display.
+"""
+import time
+from abc import abstractmethod
+from pathlib import Path
+from typing import Callable, List, Optional, Union
+
+import cv2
+import numpy as np
+
+from src.pixeler.math.rectangle import Rectangle
+from src.pixeler.vision.frame import Frame
+from src.pixeler.window.abstract_window import AbstractWindow
+from src.pixeler.window.capture import capture_box
+
+
+class VirtualWindow(AbstractWindow):
+    def __init__(self, width: int, height: int, fps: float = 30.0, realtime: bool = False, loop: bool = True):
+        """
+        Base class for windows that produce frames from a source instead of the screen.
+        Each screenshot() returns the next frame and advances a virtual clock by one frame, so runs are
+        deterministic. In realtime mode frames are paced like a live window instead.
+        :param width: The width of the frames.
+        :param height: The height of the frames.
+        :param fps: The frame rate of the source.
+        :param realtime: Waits for the next frame when the caller is faster than the source and skips frames
+        when it is slower. Otherwise every screenshot() returns the next frame immediately.
+        :param loop: Starts over at the end of the source instead of returning None.
+        """
+        self.x = 0
+        self.y = 0
+        self.w = width
+        self.h = height
+        self.fps = fps
+        self.realtime = realtime
+        self.loop = loop
+        self.index = -1
+        self.started = None
+
+    @abstractmethod
+    def render(self, index: int) -> cv2.Mat:
+        """
+        Produces a frame of the source.
+        :param index: The frame number, below frame_count().
+        :return: The frame. It may be a buffer reused by the next call.
+        """
+        pass
+
+    def frame_count(self) -> Optional[int]:
+        """
+        Returns the number of frames in the source.
+        :return: The number of frames, or None if the source never ends.
+        """
+        return None
+
+    def timestamp(self, index: int) -> float:
+        """
+        Returns the time of a frame relative to the first frame.
+        :param index: The frame number.
+        :return: The time in seconds.
+        """
+        return index / self.fps
+
+    def seek(self, elapsed: float) -> int:
+        """
+        Returns the frame shown at a time relative to the first frame.
+        :param elapsed: The time in seconds.
+        :return: The frame number.
+        """
+        return int(elapsed * self.fps)
+
+    def time(self) -> float:
+        """
+        Returns the virtual clock: the time of the last returned frame relative to the first frame.
+        :return: The time in seconds.
+        """
+        return self.timestamp(max(self.index, 0))
+
+    def rewind(self):
+        """
+        Restarts the source from the first frame.
+        """
+        self.index = -1
+        self.started = None
+
+    def focus(self):
+        pass
+
+    def maximize(self):
+        pass
+
+    def minimize(self):
+        pass
+
+    def move(self, x: int, y: int):
+        self.x = x
+        self.y = y
+
+    def close(self):
+        self.stop_capture()
+
+    def position(self) -> (int, int):
+        return self.x, self.y
+
+    def width(self):
+        return self.w
+
+    def height(self):
+        return self.h
+
+    def bounds(self) -> Rectangle:
+        return Rectangle(self.x, self.y, self.w, self.h)
+
+    def resize(self, width: int, height: int):
+        pass
+
+    def screenshot(self, region: Rectangle = None, out: cv2.Mat = None) -> Frame:
+        """
+        Returns the next frame of the source.
+        :param region: An optional Rectangle relative to the window's top-left corner.
+        :param out: An optional buffer to write the frame into. It is reused when its shape matches.
+        :return: A Frame of the source, or None once the source has ended.
+        """
+        index = self.__next_index()
+        if index is None:
+            return None
+        frame = self.render(index)
+        self.index = index
+        box = capture_box(0, 0, frame.shape[1], frame.shape[0], region)
+        crop = frame[box['top']:box['top'] + box['height'], box['left']:box['left'] + box['width']]
+        if out is not None and out.shape == crop.shape and out.dtype == crop.dtype:
+            np.copyto(out, crop)
+            return Frame(out)
+        return Frame(crop.copy())
+
+    def __next_index(self) -> Optional[int]:
+        count = self.frame_count()
+        if count == 0:
+            return None
+        index = self.index + 1
+        if self.realtime:
+            if self.started is None:
+                self.started = time.time()
+            index = max(self.seek(time.time() - self.started), index)
+        if count is not None and index >= count:
+            if not self.loop:
+                return None
+            self.rewind()
+            return self.__next_index()
+        if self.realtime:
+            due = self.started + self.timestamp(index)
+            time.sleep(max(due - time.time(), 0))
+        return index
+
+
+class ImageDirectoryWindow(VirtualWindow):
+    def __init__(self, directory: Union[str, Path], pattern: str = "*.png", fps: float = 30.0,
+                 realtime: bool = False, loop: bool = True, preload: bool = True):
+        """
+        Plays the images of a directory in name order.
+        :param directory: The directory containing the images.
+        :param pattern: A glob pattern selecting the images.
+        :param fps: The frame rate to play the images at.
+        :param realtime: Paces frames like a live window. See VirtualWindow.
+        :param loop: Starts over after the last image.
+        :param preload: Decodes every image up front so disk reads don't show up in benchmarks.
+        """
+        self.paths: List[Path] = sorted(Path(directory).glob(pattern))
+        if not self.paths:
+            raise ValueError(f"No images matching {pattern} in {directory}.")
+        self.images = [self.__load(path) for path in self.paths] if preload else None
+        first = self.images[0] if preload else self.__load(self.paths[0])
+        super().__init__(first.shape[1], first.shape[0], fps, realtime, loop)
+
+    def frame_count(self) -> Optional[int]:
+        return len(self.paths)
+
+    def render(self, index: int) -> cv2.Mat:
+        return self.images[index] if self.images is not None else self.__load(self.paths[index])
+
+    def __load(self, path: Path) -> cv2.Mat:
+        image = cv2.imread(str(path), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Could not read image {path}.")
+        return image
+
+
+class VideoWindow(VirtualWindow):
+    def __init__(self, path: Union[str, Path], fps: float = None, realtime: bool = False, loop: bool = True):
+        """
+        Plays a video file.
+        :param path: The path of the video.
+        :param fps: The frame rate to play at. Defaults to the frame rate of the video.
+        :param realtime: Paces frames like a live window. See VirtualWindow.
+        :param loop: Starts over after the last frame.
+        """
+        self.capture = cv2.VideoCapture(str(path))
+        if not self.capture.isOpened():
+            raise ValueError(f"Could not open video {path}.")
+        self.count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.next_read = 0
+        self.frame: cv2.Mat = None
+        width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        super().__init__(width, height, fps or self.capture.get(cv2.CAP_PROP_FPS) or 30.0, realtime, loop)
+
+    def frame_count(self) -> Optional[int]:
+        return self.count
+
+    def render(self, index: int) -> cv2.Mat:
+        if index != self.next_read:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ok, frame = self.capture.read(self.frame)
+        if not ok:
+            raise ValueError(f"Could not decode frame {index} of the video.")
+        self.frame = frame
+        self.next_read = index + 1
+        return frame
+
+    def close(self):
+        super().close()
+        self.capture.release()
+
+
+class SyntheticWindow(VirtualWindow):
+    def __init__(self, width: int = 1280, height: int = 720, fps: float = 30.0,
+                 scene: Callable[[int, cv2.Mat], None] = None, seed: int = 0, realtime: bool = False):
+        """
+        Generates frames procedurally. The same seed always produces the same frames.
+        :param width: The width of the frames.
+        :param height: The height of the frames.
+        :param fps: The frame rate of the scene.
+        :param scene: Draws frame `index` onto the canvas, called as scene(index, canvas).
+        Defaults to a few colored shapes moving over a noisy background.
+        :param seed: The seed of the default scene.
+        :param realtime: Paces frames like a live window. See VirtualWindow.
+        """
+        super().__init__(width, height, fps, realtime, loop=False)
+        self.scene = scene
+        self.seed = seed
+        self.canvas = np.empty((height, width, 3), dtype=np.uint8)
+        self.__build_scene()
+
+    def resize(self, width: int, height: int):
+        self.w = width
+        self.h = height
+        self.canvas = np.empty((height, width, 3), dtype=np.uint8)
+        self.__build_scene()
+
+    def render(self, index: int) -> cv2.Mat:
+        if self.scene is not None:
+            self.scene(index, self.canvas)
+            return self.canvas
+        np.copyto(self.canvas, self.background)
+        for (x, y), (dx, dy), size, color in zip(self.starts, self.velocities, self.sizes, self.colors):
+            # Bounce the shapes between the edges of the window
+            cx = int(abs((x + dx * index) % (2 * self.w) - self.w))
+            cy = int(abs((y + dy * index) % (2 * self.h) - self.h))
+            cv2.rectangle(self.canvas, (cx, cy), (cx + size, cy + size), color, cv2.FILLED)
+        return self.canvas
+
+    def __build_scene(self):
+        rng = np.random.default_rng(self.seed)
+        self.background = rng.integers(0, 48, (self.h, self.w, 3), dtype=np.uint8)
+        shapes = 8
+        self.starts = rng.uniform(0, 1, (shapes, 2)) * (self.w, self.h)
+        self.velocities = rng.uniform(-8, 8, (shapes, 2))
+        self.sizes = rng.integers(16, 64, shapes).tolist()
+        self.colors = rng.integers(64, 256, (shapes, 3)).tolist()
@@ -3,20 +3,30 @@ Class for targeting Windows OS specific windows.
 """
 
 import cv2
-import numpy as np
 import win32api
 import win32con
 import win32gui
 from mss import mss
 
+from src.pixeler.math.rectangle import Rectangle
+from src.pixeler.vision.frame import Frame
 from src.pixeler.vision.color import Color
+from src.pixeler.vision.utils import mss_to_cv2
 from src.pixeler.window.abstract_window import AbstractWindow
+from src.pixeler.window.capture import capture_box
+from src.pixeler.window.geometry import GeometryTracker
 from src.pixeler.window.overlay import Overlay
 
 
 class Win32Window(AbstractWindow):
-    def __init__(self, title: str):
+    def __init__(self, title: str, geometry_interval: float = 0.0):
+        """
+        :param title: A substring of the window title.
+        :param geometry_interval: Seconds the cached window position and size stay valid before being refreshed.
+        Defaults to reading them once per query, so screenshots follow windows moved by the user or the OS.
+        """
         self.hwnd = self.__from_title(title)
+        self.geometry = GeometryTracker(self.__fetch_geometry, geometry_interval)
         self.overlay = None
         self.hdc = None
         self.mss = None
@@ -58,15 +68,20 @@ class Win32Window(AbstractWindow):
 
     def maximize(self):
         win32gui.ShowWindow(self.hwnd, win32con.SW_MAXIMIZE)
+        self.geometry.invalidate()
 
     def minimize(self):
         win32gui.ShowWindow(self.hwnd, win32con.SW_MINIMIZE)
+        self.geometry.invalidate()
 
     def move(self, x: int, y: int):
         # Windows 10 has an invisible border of 7 pixels
-        win32gui.MoveWindow(self.hwnd, x - 7, y, self.width(), self.height(), True)
+        bounds = self.geometry.bounds()
+        win32gui.MoveWindow(self.hwnd, x - 7, y, bounds.w, bounds.h, True)
+        self.geometry.invalidate()
 
     def close(self):
+        self.stop_capture()
         if self.mss:
             self.mss.close()
         for pen in self.pens:
@@ -80,23 +95,34 @@ class Win32Window(AbstractWindow):
         Returns the width of the window.
         :return: The width of the window.
         """
-        pos = self.position()
-        return pos[2] - pos[0]
+        return self.geometry.bounds().w
 
     def height(self):
         """
         Returns the height of the window.
         :return: The height of the window.
         """
-        pos = self.position()
-        return pos[3] - pos[1]
+        return self.geometry.bounds().h
 
     def position(self) -> (int, int, int, int):
-        return win32gui.GetWindowRect(self.hwnd)
+        bounds = self.geometry.bounds()
+        return bounds.x, bounds.y, bounds.x + bounds.w, bounds.y + bounds.h
+
+    def bounds(self) -> Rectangle:
+        """
+        Returns the screen-space position and size of the window as one consistent snapshot.
+        :return: A Rectangle of the window on the screen.
+        """
+        return self.geometry.bounds()
 
     def resize(self, width: int, height: int):
         pos = self.position()
         win32gui.MoveWindow(self.hwnd, pos[0] - 7, pos[1], width, height, True)
+        self.geometry.invalidate()
+
+    def __fetch_geometry(self) -> (int, int, int, int):
+        left, top, right, bottom = win32gui.GetWindowRect(self.hwnd)
+        return left, top, right - left, bottom - top
 
     def get_hdc(self):
         """ Get the device context of the currently active (foreground) window """
@@ -104,30 +130,27 @@ class Win32Window(AbstractWindow):
             self.hdc = win32gui.GetDC(self.hwnd)
         return self.hdc
 
-    def screenshot(self) -> cv2.Mat:
+    def screenshot(self, region: Rectangle = None, out: cv2.Mat = None) -> Frame:
         """
         Takes a screenshot of the window and returns it.
-        :param sct: The mss sct object
-        :return: A Mat of the window.
+        :param region: An optional Rectangle relative to the window's top-left corner. Only this area is grabbed.
+        :param out: An optional BGR buffer to write the screenshot into. It is reused when its shape matches the
+        window, otherwise a new Mat is returned.
+        :return: A Frame of the window, which is a Mat caching its color-space conversions.
         """
         # Get the window's client rectangle (excluding title bar and borders)
         if self.mss is None:
             self.mss = mss()
-        pos = self.position()
+        bounds = self.geometry.bounds()
 
         # Define the box for capturing
-        box = {
-            'top': pos[1],
-            'left': pos[0],
-            'width': self.width(),
-            'height': self.height()
-        }
+        box = capture_box(bounds.x, bounds.y, bounds.w, bounds.h, region)
 
         # Capture the screenshot of the defined box
         shot = self.mss.grab(box)
 
         # Convert the screenshot to a format usable by OpenCV
-        return cv2.cvtColor(np.array(shot), cv2.COLOR_BGRA2BGR)
+        return mss_to_cv2(shot, out)
 
     def get_cached_pen(self, color: Color):
         color_tuple = (color.lower[0], color.lower[1], color.lower[2])
@@ -1,16 +1,26 @@
 import cv2
-import numpy as np
 import pywinctl
 from mss import mss
 from pywinbox import Point
 
+from src.pixeler.math.rectangle import Rectangle
+from src.pixeler.vision.frame import Frame
+from src.pixeler.vision.utils import mss_to_cv2
 from src.pixeler.window.abstract_window import AbstractWindow
+from src.pixeler.window.capture import capture_box
+from src.pixeler.window.geometry import GeometryTracker
 
 
 class Window(AbstractWindow):
-    def __init__(self, title: str):
+    def __init__(self, title: str, geometry_interval: float = 0.0):
+        """
+        :param title: The title of the window.
+        :param geometry_interval: Seconds the cached window position and size stay valid before being refreshed.
+        Defaults to reading them once per query, so screenshots follow windows moved by the user or the OS.
+        """
         self.mss = mss()
         self.handle = self.__from_title(title)
+        self.geometry = GeometryTracker(lambda: tuple(self.handle.box), geometry_interval)
 
     def __from_title(self, title: str, condition: int = pywinctl.Re.CONTAINS):
         """
@@ -40,6 +50,7 @@ class Window(AbstractWindow):
         """
         if self.handle:
             self.handle.maximize()
+            self.geometry.invalidate()
 
     def minimize(self):
         """
@@ -48,6 +59,7 @@ class Window(AbstractWindow):
         """
         if self.handle:
             self.handle.minimize()
+            self.geometry.invalidate()
 
     def move(self, x: int, y: int):
         """
@@ -58,6 +70,7 @@ class Window(AbstractWindow):
         """
         if self.handle:
             self.handle.moveTo(x, y)
+            self.geometry.invalidate()
 
     def close(self):
         """
@@ -66,6 +79,7 @@ class Window(AbstractWindow):
         This is identical to clicking the X button on the window.
         :return:
         """
+        self.stop_capture()
         self.mss.close()
         if self.handle:
             self.handle.close()
@@ -76,7 +90,7 @@ class Window(AbstractWindow):
         :return: The width of the window.
         """
         if self.handle:
-            return self.handle.width
+            return self.geometry.bounds().w
 
     def height(self):
         """
@@ -84,7 +98,7 @@ class Window(AbstractWindow):
         :return: The height of the window.
         """
         if self.handle:
-            return self.handle.height
+            return self.geometry.bounds().h
 
     def position(self) -> Point:
         """
@@ -92,7 +106,16 @@ class Window(AbstractWindow):
         :return: The position of the window.
         """
         if self.handle:
-            return self.handle.position
+            bounds = self.geometry.bounds()
+            return Point(bounds.x, bounds.y)
+
+    def bounds(self) -> Rectangle:
+        """
+        Returns the screen-space position and size of the window as one consistent snapshot.
+        :return: A Rectangle of the window on the screen.
+        """
+        if self.handle:
+            return self.geometry.bounds()
 
     def resize(self, width: int, height: int):
         """
@@ -103,14 +126,18 @@ class Window(AbstractWindow):
         """
         if self.handle:
             self.handle.size = (width, height)
+            self.geometry.invalidate()
 
-    def screenshot(self) -> cv2.Mat:
+    def screenshot(self, region: Rectangle = None, out: cv2.Mat = None) -> Frame:
         """
         Takes a screenshot of the window and returns it.
-        :return: A Mat of the window.
+        :param region: An optional Rectangle relative to the window's top-left corner. Only this area is grabbed.
+        :param out: An optional BGR buffer to write the screenshot into. It is reused when its shape matches the
+        window, otherwise a new Mat is returned.
+        :return: A Frame of the window, which is a Mat caching its color-space conversions.
         """
         if self.handle:
-            box = {'top': self.handle.top, 'left': self.handle.left, 'width': self.handle.size.width,
-                   'height': self.handle.height}
+            bounds = self.geometry.bounds()
+            box = capture_box(bounds.x, bounds.y, bounds.w, bounds.h, region)
             shot = self.mss.grab(box)
-            return cv2.cvtColor(np.array(shot), cv2.COLOR_BGRA2BGR)
+            return mss_to_cv2(shot, out)
@@ -0,0 +1,59 @@
+from src.pixeler.math.rectangle import Rectangle
+from src.pixeler.vision.ocr_data import OcrData
+
+TSV = "\n".join([
+    "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext",
+    "1\t1\t0\t0\t0\t0\t0\t0\t200\t60\t-1\t",
+    "2\t1\t1\t0\t0\t0\t10\t5\t180\t50\t-1\t",
+    "3\t1\t1\t1\t0\t0\t10\t5\t180\t50\t-1\t",
+    "4\t1\t1\t1\t1\t0\t10\t5\t120\t20\t-1\t",
+    "5\t1\t1\t1\t1\t1\t10\t5\t50\t20\t95.5\tHello",
+    "5\t1\t1\t1\t1\t2\t70\t5\t60\t20\t96.576843\tworld",
+    "4\t1\t1\t1\t2\t0\t10\t35\t180\t20\t-1\t",
+    "5\t1\t1\t1\t2\t1\t10\t35\t40\t20\t42.25\tGold:",
+    "5\t1\t1\t1\t2\t2\t60\t35\t30\t20\t0\t ",
+    "5\t1\t1\t1\t2\t3\t100\t35\t90\t20\t88\t1,234",
+]) + "\n"
+
+
+def test_round_trip():
+    data = OcrData.from_tsv(TSV)
+    assert len(data) == 10
+    assert data.to_tsv() == TSV
+
+
+def test_empty():
+    header = TSV.splitlines()[0] + "\n"
+    data = OcrData.from_tsv(header)
+    assert len(data) == 0
+    assert data.to_tsv() == header
+    assert OcrData.from_tsv("").to_tsv() == header
+
+
+def test_words():
+    words = OcrData.from_tsv(TSV).words()
+    assert words.text == ["Hello", "world", "Gold:", "1,234"]
+    assert words.conf.tolist() == [95.5, 96.576843, 42.25, 88]
+
+
+def test_lines():
+    assert OcrData.from_tsv(TSV).lines() == ["Hello world", "Gold: 1,234"]
+
+
+def test_filter():
+    assert OcrData.from_tsv(TSV).filter(90).text == ["Hello", "world"]
+    assert OcrData.from_tsv(TSV).filter(96.576843).text == ["world"]
+
+
+def test_within():
+    data = OcrData.from_tsv(TSV).words()
+    assert data.within(Rectangle(0, 0, 130, 30)).text == ["Hello", "world"]
+    assert data.within(Rectangle(0, 0, 100, 30)).text == ["Hello"]
+    assert data.within(Rectangle(0, 0, 100, 30), partial=True).text == ["Hello", "world"]
+
+
+def test_offset():
+    data = OcrData.from_tsv(TSV).words().offset(100, 200)
+    assert data.boxes[0].tolist() == [110, 205, 50, 20]
+    rect = data.rectangles()[-1]
+    assert (rect.x, rect.y, rect.w, rect.h) == (200, 235, 90, 20)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from src.pixeler.window.recorder import FrameReader, FrameRecorder
+from src.pixeler.window.replay_window import ReplayWindow
+
+
+def make_frames():
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (20, 30, 3), dtype=np.uint8)]
+    for _ in range(5):
+        frame = frames[-1].copy()
+        frame[rng.integers(0, 20), :] = rng.integers(0, 256, (30, 3), dtype=np.uint8)
+        frames.append(frame)
+    # A new shape starts a keyframe outside the regular interval
+    frames.append(rng.integers(0, 256, (24, 16, 3), dtype=np.uint8))
+    for _ in range(3):
+        frame = frames[-1].copy()
+        frame[:, rng.integers(0, 16)] = 255 - frame[:, 0]
+        frames.append(frame)
+    frames.append(rng.integers(0, 256, (24, 16), dtype=np.uint8))
+    return frames
+
+
+@pytest.fixture
+def recording(tmp_path):
+    frames = make_frames()
+    path = tmp_path / "frames.rec"
+    with FrameRecorder(path, keyframe_interval=4) as recorder:
+        for i, frame in enumerate(frames):
+            recorder.write(frame, timestamp=10.0 + i)
+    reader = FrameReader(path)
+    yield frames, reader
+    reader.close()
+
+
+def test_keyframes(recording):
+    frames, reader = recording
+    assert len(reader) == len(frames)
+    assert reader.index['keyframe'].tolist() == [1, 0, 0, 0, 1, 0, 1, 0, 1, 0, 1]
+
+
+def test_read_forward(recording):
+    frames, reader = recording
+    for position, frame in enumerate(frames):
+        assert np.array_equal(reader.read(position), frame)
+
+
+def test_read_backward(recording):
+    frames, reader = recording
+    for position in [9, 2, 7, 5, 0, 10, 3, 3, 6, 1]:
+        assert np.array_equal(reader.read(position), frames[position])
+
+
+def test_read_out_of_range(recording):
+    _, reader = recording
+    with pytest.raises(IndexError):
+        reader.read(len(reader))
+
+
+def test_seek(recording):
+    _, reader = recording
+    assert reader.seek(0.0) == 0
+    assert reader.seek(10.0) == 0
+    assert reader.seek(13.5) == 3
+    assert reader.seek(17.0) == 7
+    assert reader.seek(100.0) == 10
+
+
+def test_replay_empty_recording(tmp_path):
+    path = tmp_path / "empty.rec"
+    FrameRecorder(path).close()
+    for realtime in (True, False):
+        window = ReplayWindow(path, realtime=realtime, loop=True)
+        assert window.frame_count() == 0
+        assert window.screenshot() is None
+        window.close()
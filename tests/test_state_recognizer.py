@@ -0,0 +1,28 @@
+import random
+
+import pytest
+
+from src.pixeler.vision.state_recognizer import HashIndex
+
+
+@pytest.mark.parametrize("bits", [64, 256])
+def test_distances_match_bit_count(bits):
+    rng = random.Random(bits)
+    index = HashIndex(bits)
+    hashes = [rng.getrandbits(bits) for _ in range(200)]
+    for i, hash_value in enumerate(hashes):
+        index.add(hash_value, i)
+    query = rng.getrandbits(bits)
+    expected = [(query ^ hash_value).bit_count() for hash_value in hashes]
+    assert index.distances(query).tolist() == expected
+
+
+def test_search_and_nearest():
+    index = HashIndex(64)
+    for i, hash_value in enumerate([0, 0b1, 0b111, (1 << 64) - 1]):
+        index.add(hash_value, i)
+    assert len(index) == 4
+    assert index.search(0b11, 1) == [(1, 1), (1, 2)]
+    assert index.search(0b11, 2) == [(1, 1), (1, 2), (2, 0)]
+    assert index.nearest((1 << 64) - 2) == (1, 3)
+    assert index.nearest(1 << 40, max_distance=0) == (None, None)